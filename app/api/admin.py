@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, Optional
+import base64
+import binascii
+import json
+import logging
+from app.config import settings
+from app.core.security import security_manager
+from app.core.user_cache import UserSnapshot
+from app.db import get_read_db, session_scope
+from app.repositories import UserRepository
+from app.schemas import AdminUserOut, UserPage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = 1000
+
+
+async def require_admin(user: UserSnapshot = Depends(security_manager.get_current_user)) -> UserSnapshot:
+    if user.email not in settings.ADMIN_EMAILS:
+        logger.warning(f"Admin access denied for {user.email[:5]}****")
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+
+def encode_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_type: type):
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(value, expected_type) or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+class AdminRouter:
+    def __init__(self):
+        self.router = APIRouter(dependencies=[Depends(require_admin)])
+        self._register_routes()
+
+    def _register_routes(self):
+        self.router.get("/users", response_model=UserPage)(self.list_users)
+        self.router.get("/users/export")(self.export_users)
+
+    async def list_users(
+        self,
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        email_prefix: Optional[str] = Query(None, min_length=1, description="only emails starting with this"),
+        db: Session = Depends(get_read_db),
+    ):
+        """Users with their linked providers, a page at a time in id order, or email order when searching."""
+        repository = UserRepository(db)
+        if email_prefix:
+            after_email = decode_cursor(cursor, str) if cursor else None
+            users = await repository.list_page(limit, email_prefix=email_prefix, after_email=after_email)
+            next_cursor = encode_cursor(users[-1].email) if len(users) == limit else None
+        else:
+            after_id = decode_cursor(cursor, int) if cursor else 0
+            users = await repository.list_page(limit, after_id=after_id)
+            next_cursor = encode_cursor(users[-1].id) if len(users) == limit else None
+        return UserPage(items=[AdminUserOut.from_user(user) for user in users], next_cursor=next_cursor)
+
+    async def export_users(self):
+        """Every user as newline-delimited JSON, read in keyset pages while the response streams."""
+        return StreamingResponse(self._export_lines(), media_type="application/x-ndjson")
+
+    async def _export_lines(self) -> AsyncIterator[str]:
+        # Its own session: the request's is released before a streamed body finishes.
+        async with session_scope() as db:
+            repository = UserRepository(db)
+            after_id = 0
+            while True:
+                users = await repository.list_page(EXPORT_PAGE_SIZE, after_id=after_id)
+                if users:
+                    yield "".join(AdminUserOut.from_user(user).model_dump_json() + "\n" for user in users)
+                if len(users) < EXPORT_PAGE_SIZE:
+                    return
+                after_id = users[-1].id
+
+
+admin_router = AdminRouter().router
@@ -1,12 +1,18 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Path, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 import logging
 from app.models.user import User
-from app.db import get_db
-from app.schemas import UserCreate, UserOut, Token, OAuthURLResponse, LoginRequest, LoginResponse
+from app.db import get_db, get_read_db
+from app.schemas import UserCreate, UserOut, Token, OAuthURLResponse, LoginRequest, LoginResponse, RefreshRequest
+from app.services.refresh_token import RefreshTokenService
 from app.services.user import UserService
+from app.config import settings
+from app.core.oauth_state import BINDING_COOKIE, oauth_state
+from app.core.rate_limit import login_rate_limiter
+from app.core.responses import FastJSONResponse
+from app.core.resilience import CircuitOpenError
 from app.core.security import SecurityManager
 from app.services.oauth.oauth import OAuthService
 
@@ -25,37 +31,80 @@ class AuthRouter:
     def _register_routes(self):
         self.router.post("/register", response_model=UserOut, status_code=201)(self.register_user)
         self.router.post("/login", response_model=LoginResponse)(self.login_user)
+        self.router.post("/refresh", response_model=Token)(self.refresh_token)
+        self.router.post("/logout", status_code=204)(self.logout)
         self.router.get("/{provider}/url", response_model=OAuthURLResponse)(self.get_oauth_url)
         self.router.get("/{provider}/callback", response_model=Token)(self.oauth_callback)
+        self.router.get("/.well-known/jwks.json")(self.get_jwks)
 
-    def create_token_response(self, email: str) -> Token:
-        access_token = self.security_manager.create_access_token({"sub": email})
-        return Token(access_token=access_token, token_type="bearer")
+    def create_token_response(self, email: str, session_id: Optional[str] = None, refresh_token: Optional[str] = None) -> FastJSONResponse:
+        """Token pair in the ``Token`` shape, rendered directly: every field is one we just minted."""
+        claims = {"sub": email}
+        if session_id is not None:
+            claims["sid"] = session_id
+        access_token = self.security_manager.create_access_token(claims)
+        return FastJSONResponse({"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token})
+
+    async def start_session(self, db: Session, user: User) -> FastJSONResponse:
+        """Access token plus a refresh token for a new session."""
+        refresh_token, session_id = await RefreshTokenService.issue(db, user.id)
+        return self.create_token_response(user.email, session_id, refresh_token)
 
     async def register_user(self, user: UserCreate, db: Session = Depends(get_db)):
         try:
-            return self.user_service.create_user(db, user)
+            return await self.user_service.create_user_async(db, user)
         except ValueError as e:
             logger.error(f"Registration failed for user {user.email[:5]}****: {e}")
             raise HTTPException(status_code=400, detail=str(e))
 
-    async def login_user(self, login_data: LoginRequest, db: Session = Depends(get_db)):
+    async def login_user(
+        self,
+        login_data: LoginRequest,
+        request: Request,
+        db: Session = Depends(get_read_db),
+        write_db: Session = Depends(get_db),
+    ):
+        # Throttled attempts are rejected here, before any lookup or password hashing.
+        await login_rate_limiter.check(login_data.email, request.client.host if request.client else None)
         try:
-            user = self.user_service.authenticate_user(db, login_data.email, login_data.password)
+            user = await self.user_service.authenticate_user_async(db, login_data.email, login_data.password)
             if not user:
                 logger.warning(f"Failed login attempt for {login_data.email[:5]}****: Invalid credentials")
                 raise HTTPException(status_code=400, detail="Invalid credentials")
             logger.info(f"User {login_data.email[:5]}**** successfully logged in")
-            return self.create_token_response(user.email)
+            await login_rate_limiter.succeeded(login_data.email)
+            return await self.start_session(write_db, user)
         except ValueError as e:
             logger.warning(f"Failed login attempt for {login_data.email[:5]}****")
             raise HTTPException(status_code=400, detail=str(e))
 
-    async def get_oauth_url(self, provider: str = Path(..., description="OAuth provider name")):
+    async def refresh_token(self, body: RefreshRequest, db: Session = Depends(get_db)):
+        """Rotate a refresh token: one conditional write instead of a password check or OAuth round trip."""
+        user, refresh_token, session_id = await RefreshTokenService.rotate(db, body.refresh_token)
+        return self.create_token_response(user.email, session_id, refresh_token)
+
+    async def logout(self, body: RefreshRequest, db: Session = Depends(get_db)):
+        """Revoke the session, including access tokens already issued for it."""
+        await RefreshTokenService.revoke(db, body.refresh_token)
+
+    async def get_jwks(self):
+        """Public signing keys, so other services can verify access tokens without the secret."""
+        return self.security_manager.token_engine.jwks()
+
+    async def get_oauth_url(self, request: Request, response: Response, provider: str = Path(..., description="OAuth provider name")):
+        # The state only works at a callback that carries this browser's binding
+        # cookie, so a callback URL for someone else's login cannot be planted.
+        binding = request.cookies.get(BINDING_COOKIE) or oauth_state.new_binding()
         try:
-            oauth_url = await self.oauth_service.get_oauth_login_url(provider)
+            oauth_url = await self.oauth_service.get_oauth_login_url(provider, binding=binding)
+            response.set_cookie(
+                BINDING_COOKIE, binding, max_age=settings.OAUTH_STATE_TTL, path="/auth",
+                httponly=True, samesite="lax", secure=settings.OAUTH_STATE_COOKIE_SECURE,
+            )
             logger.info(f"Generated OAuth URL for provider: {provider}")
             return OAuthURLResponse(url=oauth_url)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to generate OAuth URL for {provider}: {e}")
             raise HTTPException(status_code=500, detail="Failed to generate OAuth login URL")
@@ -64,34 +113,42 @@ class AuthRouter:
         self,
         provider: str = Path(..., description="OAuth provider name"),
         code: Optional[str] = Query(None, description="Authorization code from the OAuth provider"),
+        state: Optional[str] = Query(None, description="State issued with the authorize URL"),
+        oauth_binding: Optional[str] = Cookie(None, alias=BINDING_COOKIE, include_in_schema=False),
         db: Session = Depends(get_db)
     ):
         if not code:
             logger.error(f"Missing authorization code for {provider}")
             raise HTTPException(status_code=400, detail="Authorization code not provided")
+        code_verifier = await oauth_state.consume(state, self.oauth_service.get_provider(provider).name, oauth_binding)
 
         try:
             logger.info(f"Exchanging code for access token with {provider}")
-            token_data = await self.oauth_service.exchange_code_for_token(provider, code)
+            token_data = await self.oauth_service.exchange_code_for_token(provider, code, code_verifier)
 
             if "access_token" not in token_data:
                 logger.error(f"Failed to retrieve access token from {provider}")
                 raise HTTPException(status_code=400, detail="Failed to retrieve access token")
 
             logger.info(f"Fetching user data from {provider}")
-            user_data = await self.oauth_service.get_oauth_user_data(provider, token_data['access_token'])
+            user_data = await self.oauth_service.get_oauth_user_data(
+                provider, token_data['access_token'], token_data.get('id_token')
+            )
 
             if "email" not in user_data:
                 logger.error(f"Email not provided by {provider}")
                 raise HTTPException(status_code=400, detail="Email not provided by the OAuth provider")
 
             logger.info(f"Creating or updating user for {provider}")
-            user = self.user_service.get_or_create_oauth_user(
-                db, user_data["email"], provider, user_data["id"], user_data.get("name")
+            # ``oauth_user_id`` is the identity as a string; GitHub's ``id`` is an int.
+            user = await self.user_service.get_or_create_oauth_user_async(
+                db, user_data["email"], user_data["oauth_provider"], user_data.get("oauth_user_id"), user_data.get("name")
             )
 
-            return self.create_token_response(user.email)
+            return await self.start_session(db, user)
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             logger.exception(f"Error during OAuth callback for {provider}: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to authenticate with {provider}")
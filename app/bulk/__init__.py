@@ -0,0 +1 @@
+from app.bulk.users import ImportReport, export_users, import_users, read_rows
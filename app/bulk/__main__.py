@@ -0,0 +1,72 @@
+"""Bulk user import and export, streaming so memory stays flat for any file size.
+
+    python -m app.bulk import users.csv [--workers 8] [--batch-size 1000] [--rejects rejects.jsonl]
+    python -m app.bulk export backup.jsonl
+
+Input rows have ``email``, optional ``full_name`` and ``is_active``, and
+either a plaintext ``password`` (hashed with the configured policy on a
+process pool) or a ``hashed_password`` kept as is. Exports include password
+hashes and can be imported again. The format follows the file extension
+(``.csv``, ``.jsonl``) unless ``--format`` is given; ``-`` means stdin/stdout.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import sys
+
+from app.bulk.users import FORMATS, detect_format, export_users, import_users, read_rows
+from app.db import engine
+
+
+def _open(path: str, mode: str, stack: contextlib.ExitStack):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return stack.enter_context(open(path, mode, newline="", encoding="utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    import_parser = subcommands.add_parser("import", help="create users from a CSV or JSONL file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT and transaction")
+    import_parser.add_argument("--workers", type=int, default=0, help="hashing processes; 0: one per CPU, 1: no pool")
+    import_parser.add_argument("--fail-on-duplicate", action="store_true", help="stop instead of skipping known emails")
+    import_parser.add_argument("--rejects", help="write skipped rows as JSONL (line, email, reason) to this file")
+    export_parser = subcommands.add_parser("export", help="write all users to a CSV or JSONL file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    format = args.format or ("jsonl" if args.path == "-" else detect_format(args.path))
+    with contextlib.ExitStack() as stack:
+        if args.command == "export":
+            count = export_users(engine, _open(args.path, "w", stack), format)
+            print(f"Exported {count} users", file=sys.stderr)
+            return
+        rejects = _open(args.rejects, "w", stack) if args.rejects else None
+
+        def on_reject(line, email, reason):
+            if rejects is not None:
+                rejects.write(json.dumps({"line": line, "email": email, "reason": reason}) + "\n")
+
+        try:
+            report = import_users(
+                engine,
+                read_rows(_open(args.path, "r", stack), format),
+                batch_size=args.batch_size,
+                workers=args.workers,
+                skip_duplicates=not args.fail_on_duplicate,
+                on_reject=on_reject,
+            )
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(report.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, EmailStr, Field, ValidationError, constr, model_validator
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from app.core.hashing import _hash_password, _init_worker_context, get_password_context, get_policy
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+EXPORT_COLUMNS = ("id", "email", "full_name", "hashed_password", "is_active", "created_at")
+
+
+class ImportedUser(BaseModel):
+    """One input row: a plaintext ``password`` to hash, or a ``hashed_password`` to keep."""
+
+    email: EmailStr
+    full_name: Optional[str] = Field(None, min_length=1, max_length=100)
+    password: Optional[constr(min_length=8)] = None
+    hashed_password: Optional[str] = None
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def _one_password(self):
+        if (self.password is None) == (self.hashed_password is None):
+            raise ValueError("exactly one of password and hashed_password is required")
+        return self
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.read / self.seconds, 1) if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+def detect_format(path: str, format: Optional[str] = None) -> str:
+    format = format or os.path.splitext(path)[1].lstrip(".").lower()
+    if format == "json":
+        format = "jsonl"
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format {format!r}; use one of {FORMATS}")
+    return format
+
+
+def read_rows(stream: IO[str], format: str) -> Iterator[Dict]:
+    """Yield input rows one at a time; blank CSV cells count as missing."""
+    if format == "csv":
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if key and value not in (None, "")}
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _batches(rows: Iterable[Dict], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    batch = []
+    for number, row in enumerate(rows, start=1):
+        batch.append((number, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _registered_emails(engine: Engine, emails: Iterable[str]) -> Set[str]:
+    """Which of ``emails`` are registered already; one query per batch."""
+    with engine.connect() as conn:
+        return set(conn.execute(select(User.email).where(User.email.in_(set(emails)))).scalars())
+
+
+class _InlineExecutor:
+    def map(self, fn, iterable, chunksize: int = 1):
+        return map(fn, iterable)
+
+
+def _insert_batch(engine: Engine, rows: List[Dict]) -> List[str]:
+    """Insert ``rows`` in one transaction; returns emails that turned out to exist already.
+
+    A unique violation means someone registered one of the emails since the
+    import started: those rows are dropped and the rest retried once.
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), rows)
+        return []
+    except IntegrityError:
+        emails = [row["email"] for row in rows]
+        with engine.connect() as conn:
+            taken = set(conn.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        if not taken:
+            raise
+        remaining = [row for row in rows if row["email"] not in taken]
+        if remaining:
+            with engine.begin() as conn:
+                conn.execute(insert(User.__table__), remaining)
+        return sorted(taken)
+
+
+def import_users(
+    engine: Engine,
+    rows: Iterable[Dict],
+    batch_size: int = 1000,
+    workers: int = 0,
+    skip_duplicates: bool = True,
+    progress_every: int = 10,
+    on_reject: Optional[Callable[[int, str, str], None]] = None,
+) -> ImportReport:
+    """Validate, hash and insert ``rows`` in batches, each in its own transaction.
+
+    Plaintext passwords are hashed on ``workers`` processes (``0``: one per
+    CPU; ``1``: in this process). Rows whose email is already registered, or
+    repeats one earlier in the input, are counted as duplicates and skipped,
+    or with ``skip_duplicates=False`` stop the import with ``ValueError``.
+    Duplicates are looked up one batch at a time, earlier batches being
+    committed by then, and skipped rows are passed to
+    ``on_reject(line, email, reason)`` rather than kept, so memory is bounded
+    by ``batch_size`` whatever the size of the input or the users table.
+    """
+    report = ImportReport()
+    reject = on_reject or (lambda line, email, reason: None)
+    context = get_password_context()
+    workers = workers or os.cpu_count() or 1
+    executor: Executor = (
+        ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_context, initargs=(get_policy(),))
+        if workers > 1 else _InlineExecutor()
+    )
+    start = time.perf_counter()
+    try:
+        for batch_number, batch in enumerate(_batches(rows, batch_size), start=1):
+            valid: List[Tuple[int, ImportedUser]] = []
+            for line, row in batch:
+                report.read += 1
+                try:
+                    user = ImportedUser.model_validate(row)
+                except ValidationError as e:
+                    report.invalid += 1
+                    reject(line, str(row.get("email", "")), e.errors()[0]["msg"])
+                    continue
+                if user.hashed_password is not None and context.identify(user.hashed_password, required=False) is None:
+                    report.invalid += 1
+                    reject(line, user.email, "unrecognized password hash")
+                    continue
+                valid.append((line, user))
+
+            known = _registered_emails(engine, (user.email for _, user in valid)) if valid else set()
+            accepted: List[Tuple[int, ImportedUser]] = []
+            for line, user in valid:
+                if user.email in known:
+                    if not skip_duplicates:
+                        raise ValueError(f"Line {line}: {user.email} is already registered")
+                    report.duplicates += 1
+                    reject(line, user.email, "duplicate")
+                    continue
+                # Repeats within this batch; later batches find it in the table.
+                known.add(user.email)
+                accepted.append((line, user))
+
+            plaintext = [user.password for _, user in accepted if user.hashed_password is None]
+            hashes = iter(executor.map(_hash_password, plaintext, chunksize=max(1, len(plaintext) // (workers * 4))))
+            values = [
+                {
+                    "email": user.email,
+                    "full_name": user.full_name,
+                    "hashed_password": user.hashed_password or next(hashes),
+                    "is_active": user.is_active,
+                }
+                for _, user in accepted
+            ]
+            if values:
+                taken = set(_insert_batch(engine, values))
+                for line, user in accepted:
+                    if user.email in taken:
+                        report.duplicates += 1
+                        reject(line, user.email, "duplicate")
+                report.inserted += len(values) - len(taken)
+            report.seconds = time.perf_counter() - start
+            if progress_every and batch_number % progress_every == 0:
+                logger.info(f"Imported {report.inserted}/{report.read} rows ({report.rows_per_second} rows/s)")
+    finally:
+        if isinstance(executor, ProcessPoolExecutor):
+            executor.shutdown()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def export_users(engine: Engine, stream: IO[str], format: str, page_size: int = 1000) -> int:
+    """Write every user, password hashes included, in primary-key pages; returns the row count.
+
+    The output can be imported again as is.
+    """
+    columns = [User.__table__.c[name] for name in EXPORT_COLUMNS]
+    writer = csv.writer(stream) if format == "csv" else None
+    if writer is not None:
+        writer.writerow(EXPORT_COLUMNS)
+    exported, last_id = 0, 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(select(*columns).where(User.id > last_id).order_by(User.id).limit(page_size)).all()
+            for row in rows:
+                record = dict(zip(EXPORT_COLUMNS, row))
+                if record["created_at"] is not None:
+                    record["created_at"] = record["created_at"].isoformat()
+                if writer is not None:
+                    writer.writerow(record[name] for name in EXPORT_COLUMNS)
+                else:
+                    stream.write(json.dumps(record) + "\n")
+            exported += len(rows)
+            if len(rows) < page_size:
+                return exported
+            last_id = rows[-1][0]
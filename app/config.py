@@ -1,4 +1,5 @@
 # app/config.py
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,7 +7,32 @@ class Settings(BaseSettings):
 
     SECRET_KEY: str
 
+    JWT_BACKEND: str = "jose"
+    JWT_ALGORITHM: str = "HS256"
+    JWT_ACTIVE_KID: str = "default"
+    JWT_KEYS: Dict[str, str] = {}
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    REVOCATION_SYNC_INTERVAL: float = 30.0
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_MODE: str = "sync"
+    DB_MIGRATE_ON_STARTUP: bool = False
+    DATABASE_READ_URL: Optional[str] = None
+    DB_READ_POOL_ENABLED: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
 
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
@@ -20,6 +46,74 @@ class Settings(BaseSettings):
     LINKEDIN_CLIENT_SECRET: str
     LINKEDIN_REDIRECT_URI: str
 
+    OAUTH_PROVIDER_PLUGINS: List[str] = []
+
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_CALIBRATE: bool = False
+    PASSWORD_HASH_TARGET_MS: float = 250.0
+
+    HASH_EXECUTOR: str = "thread"
+    HASH_MAX_WORKERS: int = 0
+    HASH_MAX_PENDING: int = 64
+
+    ADMIN_EMAILS: List[str] = []
+
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_PER_EMAIL: int = 10
+    LOGIN_RATE_LIMIT_PER_IP: int = 100
+    LOGIN_RATE_LIMIT_WINDOW: float = 60.0
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_CACHE_SIZE: int = 100000
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+
+    EMAIL_INDEX_ENABLED: bool = True
+    EMAIL_INDEX_CAPACITY: int = 1000000
+    EMAIL_INDEX_ERROR_RATE: float = 0.001
+    EMAIL_INDEX_SYNC_INTERVAL: float = 5.0
+    EMAIL_INDEX_REBUILD_INTERVAL: float = 3600.0
+    EMAIL_INDEX_SYNC_OVERLAP: float = 60.0
+    EMAIL_INDEX_MISS_SYNC_INTERVAL: float = 0.1
+
+    METRICS_ENABLED: bool = True
+
+    SQL_TRACE_ENABLED: bool = False
+    SQL_QUERY_BUDGET: int = 10
+    SQL_REPEAT_THRESHOLD: int = 3
+    SQL_SLOW_QUERY_MS: float = 100.0
+
+    TOKEN_CACHE_SIZE: int = 10000
+
+    USER_CACHE_BACKEND: str = "memory"
+    USER_CACHE_TTL: int = 300
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_REDIS_URL: Optional[str] = None
+
+    HTTP_CLIENT_HTTP2: bool = True
+    HTTP_CLIENT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 5.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = 30.0
+    OAUTH_PROVIDER_TIMEOUTS: Dict[str, float] = {}
+    OAUTH_RETRY_ATTEMPTS: int = 3
+    OAUTH_RETRY_BASE_DELAY: float = 0.1
+    OAUTH_RETRY_MAX_DELAY: float = 1.0
+    OAUTH_BREAKER_FAILURE_THRESHOLD: int = 5
+    OAUTH_BREAKER_RESET_TIMEOUT: float = 30.0
+    OAUTH_HEDGE_DELAY: float = 0.0
+    OAUTH_OIDC_ENABLED: bool = True
+    OAUTH_OIDC_CACHE_TTL: float = 3600.0
+    OAUTH_STATE_TTL: int = 600
+    OAUTH_STATE_BACKEND: str = "memory"
+    OAUTH_STATE_CACHE_SIZE: int = 100000
+    OAUTH_STATE_REDIS_URL: Optional[str] = None
+    OAUTH_STATE_COOKIE_SECURE: bool = True
+    OAUTH_PKCE_ENABLED: bool = True
+
     model_config = SettingsConfigDict(
         env_file=".env" 
     )
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from app.config import settings
+from app.core.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10000
+
+
+class EmailIndex:
+    """Bloom filter of registered emails, so logins for unknown ones skip the user lookup.
+
+    A miss means the email is not registered in this process's view, which
+    may be stale: callers confirm it with ``refresh`` before relying on it.
+    Emails registered here are added at once; ones registered by other
+    workers arrive with the next ``sync``. Ids are not committed in order, so
+    each sync re-reads every id above the highest one seen ``overlap``
+    seconds ago; a registration whose transaction stays open longer than
+    that waits for the next ``rebuild``. ``rebuild`` starts over from the
+    whole table, which drops deleted emails and keeps the false-positive
+    rate in check. Until the first rebuild every email is reported as
+    possibly present.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+        enabled: bool = True,
+        overlap: float = 60.0,
+        refresh_interval: float = 0.1,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.enabled = enabled
+        self.overlap = overlap
+        self.refresh_interval = refresh_interval
+        self._bloom: Optional[BloomFilter] = None
+        self._last_id = 0
+        # (monotonic time a read finished, highest id seen by then), oldest first
+        self._checkpoints: Deque[Tuple[float, int]] = deque()
+        self._added_during_rebuild: Optional[List[str]] = None
+        self._pending_refresh: Optional[asyncio.Task] = None
+        self._last_refresh = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def might_contain(self, email: str) -> bool:
+        return self._bloom is None or email in self._bloom
+
+    def add(self, email: str) -> None:
+        if self._bloom is not None:
+            self._bloom.add(email)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(email)
+
+    def _low_water(self) -> int:
+        """Highest id seen at least ``overlap`` seconds ago; lower ids have all committed by now."""
+        cutoff = time.monotonic() - self.overlap
+        while len(self._checkpoints) > 1 and self._checkpoints[1][0] <= cutoff:
+            self._checkpoints.popleft()
+        return self._checkpoints[0][1] if self._checkpoints else 0
+
+    async def _load(self, bloom: BloomFilter, after_id: int, seen_id: int = 0) -> int:
+        """Add emails with ids above ``after_id``; ids up to ``seen_id`` are re-reads, added only if missing."""
+        from app.db import session_scope
+        from app.repositories import UserRepository
+
+        async with session_scope() as db:
+            repository = UserRepository(db)
+            while True:
+                rows = await repository.emails_after(after_id, PAGE_SIZE)
+                for user_id, email in rows:
+                    if user_id > seen_id or email not in bloom:
+                        bloom.add(email)
+                if len(rows) < PAGE_SIZE:
+                    return max(seen_id, rows[-1][0] if rows else after_id)
+                after_id = rows[-1][0]
+
+    async def rebuild(self) -> None:
+        if not self.enabled:
+            return
+        from app.db import session_scope
+        from app.repositories import UserRepository
+
+        async with session_scope() as db:
+            count = await UserRepository(db).count()
+        bloom = BloomFilter(max(self.capacity, count * 2), self.error_rate)
+        self._added_during_rebuild = []
+        try:
+            last_id = await self._load(bloom, 0)
+            for email in self._added_during_rebuild:
+                bloom.add(email)
+        finally:
+            self._added_during_rebuild = None
+        self._bloom, self._last_id = bloom, last_id
+        self._checkpoints.append((time.monotonic(), last_id))
+        logger.info(f"Email index rebuilt with {bloom.count} emails")
+
+    async def sync(self) -> None:
+        """Add emails registered since the last sync, rebuilding once the filter is over capacity."""
+        if self._bloom is None or self._bloom.count >= self._bloom.capacity:
+            await self.rebuild()
+            return
+        self._last_id = await self._load(self._bloom, self._low_water(), self._last_id)
+        self._checkpoints.append((time.monotonic(), self._last_id))
+
+    async def refresh(self) -> None:
+        """Return once a sync that started after this call has finished.
+
+        Concurrent callers share one sync, and syncs are spaced at least
+        ``refresh_interval`` seconds apart, so a flood of misses costs a few
+        small range reads rather than a lookup each.
+        """
+        if not self.ready:
+            return
+        loop = asyncio.get_running_loop()
+        if self._pending_refresh is None or self._pending_refresh.get_loop() is not loop:
+            self._pending_refresh = loop.create_task(self._refresh())
+        await asyncio.shield(self._pending_refresh)
+
+    async def _refresh(self) -> None:
+        await asyncio.sleep(max(0.0, self._last_refresh + self.refresh_interval - time.monotonic()))
+        # Callers arriving from now on need a sync that starts after them.
+        self._pending_refresh = None
+        self._last_refresh = time.monotonic()
+        try:
+            await self.sync()
+        except Exception:
+            logger.exception("Failed to refresh the email index")
+
+    async def run(self, sync_interval: float, rebuild_interval: float) -> None:
+        elapsed = 0.0
+        while True:
+            await asyncio.sleep(sync_interval)
+            elapsed += sync_interval
+            try:
+                if elapsed >= rebuild_interval:
+                    elapsed = 0.0
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("Failed to refresh the email index")
+
+
+email_index = EmailIndex(
+    capacity=settings.EMAIL_INDEX_CAPACITY,
+    error_rate=settings.EMAIL_INDEX_ERROR_RATE,
+    enabled=settings.EMAIL_INDEX_ENABLED,
+    overlap=settings.EMAIL_INDEX_SYNC_OVERLAP,
+    refresh_interval=settings.EMAIL_INDEX_MISS_SYNC_INTERVAL,
+)
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+
+
+def policy_from_settings() -> Dict:
+    """CryptContext keyword arguments for the configured hashing policy.
+
+    The configured scheme hashes new passwords; the other one is kept only to
+    verify old hashes, which ``deprecated="auto"`` flags for rehashing, as are
+    hashes whose cost parameters differ from the current ones.
+    """
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    return {
+        "schemes": [scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme],
+        "deprecated": "auto",
+        "bcrypt__rounds": settings.BCRYPT_ROUNDS,
+        "argon2__type": "ID",
+        "argon2__time_cost": settings.ARGON2_TIME_COST,
+        "argon2__memory_cost": settings.ARGON2_MEMORY_COST,
+        "argon2__parallelism": settings.ARGON2_PARALLELISM,
+    }
+
+
+_policy: Dict = policy_from_settings()
+_pwd_context: Optional[CryptContext] = None
+
+
+def _init_worker_context(policy: Optional[Dict] = None) -> None:
+    """Build the CryptContext used by the current process."""
+    global _pwd_context
+    _pwd_context = CryptContext(**(policy or _policy))
+
+
+def _get_context() -> CryptContext:
+    if _pwd_context is None:
+        _init_worker_context()
+    return _pwd_context
+
+
+def get_password_context() -> CryptContext:
+    return _get_context()
+
+
+def get_policy() -> Dict:
+    return dict(_policy)
+
+
+def set_policy(policy: Dict) -> None:
+    """Switch the hashing policy; worker processes pick it up when the pool restarts."""
+    global _policy
+    _policy = dict(policy)
+    _init_worker_context(_policy)
+    password_hash_executor.shutdown()
+
+
+def calibrate_policy(policy: Dict, target_ms: float) -> Dict:
+    """Return ``policy`` with the primary scheme's cost raised as far as fits ``target_ms``.
+
+    Hashing time is proportional to argon2's ``time_cost`` and to
+    ``2 ** rounds`` for bcrypt, so one timing at the minimum cost is enough to
+    extrapolate. The configured cost is a floor: a fast host never hashes
+    below it. Any hash at or above that floor is accepted without a rehash,
+    so hosts that calibrate differently do not keep rehashing each other's
+    hashes.
+    """
+    policy = dict(policy)
+    scheme = policy["schemes"][0]
+    setting = "bcrypt__rounds" if scheme == "bcrypt" else "argon2__time_cost"
+    configured = policy[setting]
+    probe = dict(policy)
+    probe[setting] = 10 if scheme == "bcrypt" else 1
+    context = CryptContext(**probe)
+    start = time.perf_counter()
+    context.hash("calibration-password")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if scheme == "bcrypt":
+        calibrated = min(20, 10 + int(math.log2(max(target_ms / elapsed_ms, 1))))
+    else:
+        calibrated = int(target_ms // elapsed_ms)
+    policy[setting] = max(configured, calibrated)
+    policy[f"{scheme}__min_rounds"] = configured
+    policy[f"{scheme}__max_rounds"] = context.handler(scheme).max_rounds
+    logger.info(f"Calibrated {scheme} to {setting.split('__')[1]}={policy[setting]} for a {target_ms:.0f} ms budget")
+    return policy
+
+
+def _hash_password(password: str) -> str:
+    return _get_context().hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _get_context().verify(plain_password, hashed_password)
+
+
+class HashingCapacityExceeded(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+
+class PasswordHashExecutor:
+    """Runs bcrypt work off the event loop on a bounded thread or process pool.
+
+    At most ``max_pending`` jobs may be queued or running at once; further
+    submissions are rejected with a 503 instead of piling up behind the pool.
+    """
+
+    KINDS = ("thread", "process", "inline")
+
+    def __init__(self, kind: str = "thread", max_workers: int = 0, max_pending: int = 64):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unsupported hashing executor: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers, initializer=_init_worker_context, initargs=(get_policy(),)
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix="password-hash"
+                        )
+        return self._pool
+
+    async def run(self, fn: Callable, *args):
+        """Run ``fn(*args)`` on the pool, raising a 503 when the queue is full."""
+        if self.kind == "inline":
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Password hashing queue is full (%d pending)", self.max_pending)
+            raise HashingCapacityExceeded()
+        try:
+            future: Future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Free the slot when the job finishes, not when the caller stops waiting,
+        # so cancelled requests cannot push more work than the pool can hold.
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+    def has_capacity(self) -> bool:
+        """Whether ``run`` would currently accept a job."""
+        if self.kind == "inline":
+            return True
+        if not self._slots.acquire(blocking=False):
+            return False
+        self._slots.release()
+        return True
+
+    async def hash(self, password: str) -> str:
+        return await self.run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(_verify_password, plain_password, hashed_password)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+class FakeVerifier:
+    """Makes a failed login for an unknown account take as long as one for a real account.
+
+    Real checks report their duration with ``record``. ``wait`` sleeps for one
+    of the recent durations picked at random, so the latency distribution,
+    queueing under load included, matches without any hashing. Until
+    ``min_samples`` durations are known it awaits ``fallback`` instead, which
+    should be a real verify against a precomputed hash, and records that.
+    """
+
+    def __init__(self, samples: int = 256, min_samples: int = 8):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    async def wait(self, fallback: Callable[[], Awaitable]) -> None:
+        if len(self._samples) >= self.min_samples:
+            await asyncio.sleep(random.choice(self._samples))
+            return
+        start = time.perf_counter()
+        await fallback()
+        self.record(time.perf_counter() - start)
+
+
+fake_verifier = FakeVerifier()
+
+password_hash_executor = PasswordHashExecutor(
+    kind=settings.HASH_EXECUTOR,
+    max_workers=settings.HASH_MAX_WORKERS,
+    max_pending=settings.HASH_MAX_PENDING,
+)
@@ -0,0 +1,87 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SharedHTTPClient:
+    """Process-wide ``httpx.AsyncClient`` for outbound calls to OAuth providers.
+
+    The client is opened once in the application lifespan so provider calls
+    reuse pooled keep-alive connections instead of paying a TCP and TLS
+    handshake per request. Connection counters come from httpcore's ``trace``
+    extension and show how often a pooled connection was reused.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    def _http2_available(self) -> bool:
+        if not settings.HTTP_CLIENT_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            return False
+        return True
+
+    def start(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self._http2_available(),
+                timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [self._on_request]},
+                transport=self.transport,
+            )
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use when the lifespan did not start it."""
+        return self._client or self.start()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Outbound HTTP client closed: %s", self.stats())
+
+    def timeout_for(self, provider: str) -> httpx.Timeout:
+        """Per-provider timeout, falling back to ``HTTP_CLIENT_TIMEOUT``."""
+        read_timeout = settings.OAUTH_PROVIDER_TIMEOUTS.get(provider, settings.HTTP_CLIENT_TIMEOUT)
+        return httpx.Timeout(read_timeout, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT)
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(self.requests - self.connections_opened, 0),
+            "tls_handshakes": self.tls_handshakes,
+        }
+
+
+shared_http_client = SharedHTTPClient()
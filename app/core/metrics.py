@@ -0,0 +1,326 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shards:
+    """Per-thread arrays of floats that are summed when read.
+
+    Each thread only ever writes to its own array, so recording a value is a
+    thread-local lookup and an in-place add; the lock is taken once per thread
+    to register its shard and when the metrics are collected.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> List[float]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0.0] * self.size
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def collect(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0.0] * self.size
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.collect()[0]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] -= amount
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf, then the sum and the count.
+        self._shards = _Shards(len(buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        shard = self._shards.get()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def collect(self) -> Tuple[List[float], float, float]:
+        values = self._shards.collect()
+        cumulative, running = [], 0.0
+        for count in values[:-2]:
+            running += count
+            cumulative.append(running)
+        return cumulative, values[-2], values[-1]
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for one combination of label values; cache it when recording in a loop."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    def _label_string(self, values: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(self.labelnames, values), *extra)]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            unique = {id(child): (tuple(str(value) for value in values), child) for values, child in self._children.items()}
+        return sorted(unique.values(), key=lambda item: item[0])
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in self._series():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_string(values)} {_format(child.value())}"]
+
+
+class _CallbackMixin:
+    _functions: Optional[Dict[Tuple[str, ...], Callable[[], float]]] = None
+
+    def set_function(self, function: Callable[[], float], *label_values) -> None:
+        """Read the value from ``function`` at collection time instead of recording it."""
+        if self._functions is None:
+            self._functions = {}
+        self._functions[tuple(str(value) for value in label_values)] = function
+
+    def render(self) -> List[str]:
+        if self._functions is None:
+            return super().render()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, function in sorted(self._functions.items()):
+            lines.append(f"{self.name}{self._label_string(values)} {_format(function())}")
+        return lines
+
+
+class Counter(_CallbackMixin, Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_CallbackMixin, Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        cumulative, total, count = child.collect()
+        bounds = [_format(bound) for bound in self.buckets] + ["+Inf"]
+        lines = [
+            f"{self.name}_bucket{self._label_string(values, (('le', bound),))} {_format(bucket)}"
+            for bound, bucket in zip(bounds, cumulative)
+        ]
+        lines.append(f"{self.name}_sum{self._label_string(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_string(values)} {_format(count)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.type}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status")
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+http_requests_in_progress = metrics.gauge("http_requests_in_progress", "HTTP requests currently being handled.")
+auth_stage_duration_seconds = metrics.histogram(
+    "auth_stage_duration_seconds", "Time spent in each stage of the login, registration and OAuth flows.", ("stage",)
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of the enclosed block under ``auth_stage_duration_seconds``."""
+    child = auth_stage_duration_seconds.labels(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """Decorator form of ``stage_timer`` for sync and async functions."""
+    def decorator(function):
+        child = auth_stage_duration_seconds.labels(stage)
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _route_template(scope) -> str:
+    """Template of the matched route, e.g. ``/auth/{provider}/url``.
+
+    Routers included lazily match their own un-prefixed route, so the
+    prefixed copy FastAPI records for the match is preferred when present.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective, "path_format", None) or getattr(route, "path_format", None) or scope["path"]
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template.
+
+    Requests that match no route are grouped under ``unmatched`` so arbitrary
+    paths cannot blow up the number of series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            template = _route_template(scope)
+            method = scope["method"]
+            http_request_duration_seconds.labels(method, template).observe(elapsed)
+            http_requests_total.labels(method, template, status_code).inc()
@@ -0,0 +1,221 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+oauth_state_rejections_total = metrics.counter(
+    "oauth_state_rejections_total", "OAuth callbacks rejected because of their state parameter.", ("reason",)
+)
+
+# Tolerated difference between the clocks of the node that issued a state and the one checking it.
+CLOCK_SKEW = 30
+
+# HttpOnly cookie holding the secret that ties states to the browser that asked for them.
+BINDING_COOKIE = "oauth_binding"
+
+
+class InvalidStateError(HTTPException):
+    def __init__(self, reason: str):
+        oauth_state_rejections_total.labels(reason).inc()
+        super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid OAuth state: {reason}")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class StateStoreBackend(ABC):
+    """Short-lived keys for consumed states and PKCE verifiers; ``expires_at`` is a Unix timestamp."""
+
+    @abstractmethod
+    async def add(self, key: str, expires_at: float) -> bool:
+        """Record ``key`` unless it is already present; ``False`` means it was seen before."""
+        pass
+
+    @abstractmethod
+    async def put(self, key: str, value: str, expires_at: float) -> None:
+        pass
+
+    @abstractmethod
+    async def pop(self, key: str) -> Optional[str]:
+        """Return and delete the value for ``key``, so it can be read only once."""
+        pass
+
+
+class InMemoryStateStore(StateStoreBackend):
+    """Per-process store bounded to ``max_size`` keys, evicting expired ones first.
+
+    When it is full of live keys the oldest one is dropped, and states that
+    expire no later than it are refused from then on. A flood of logins can
+    therefore make old states fail, but never lets one be replayed.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self._evicted_until = 0.0
+        self._lock = threading.Lock()
+
+    def _insert(self, key: str, expires_at: float, value: Optional[str]) -> None:
+        now = time.time()
+        # States share one TTL, so insertion order is close to expiry order.
+        while self._entries:
+            oldest, (oldest_expiry, _) = next(iter(self._entries.items()))
+            if oldest_expiry > now and len(self._entries) < self.max_size:
+                break
+            del self._entries[oldest]
+            if oldest_expiry > now:
+                self._evicted_until = max(self._evicted_until, oldest_expiry)
+        self._entries[key] = (expires_at, value)
+
+    async def add(self, key: str, expires_at: float) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and entry[0] > time.time()) or expires_at <= self._evicted_until:
+                return False
+            self._insert(key, expires_at, None)
+            return True
+
+    async def put(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._insert(key, expires_at, value)
+
+    async def pop(self, key: str) -> Optional[str]:
+        with self._lock:
+            expires_at, value = self._entries.pop(key, (0.0, None))
+        return value if expires_at > time.time() else None
+
+
+class RedisStateStore(StateStoreBackend):
+    """Shared store on any client exposing redis-py's asyncio ``set`` and ``getdel``."""
+
+    def __init__(self, client, prefix: str = "auth:oauth-state:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def add(self, key: str, expires_at: float) -> bool:
+        return bool(await self.client.set(self.prefix + key, "1", nx=True, exat=int(expires_at) + 1))
+
+    async def put(self, key: str, value: str, expires_at: float) -> None:
+        await self.client.set(self.prefix + key, value, exat=int(expires_at) + 1)
+
+    async def pop(self, key: str) -> Optional[str]:
+        value = await self.client.getdel(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+
+class OAuthStateManager:
+    """Issues and checks the OAuth ``state`` parameter without database I/O.
+
+    A state is ``payload.mac``: the payload names the provider, a random
+    nonce, the issue time, whether a PKCE verifier was stored and a MAC of
+    the browser's binding secret; the outer MAC is an HMAC-SHA256 over it
+    keyed from ``SECRET_KEY``. The signature, age and binding are checked
+    locally, so a callback URL started by someone else is refused (login
+    CSRF). Single use is enforced by recording the nonce in the store, which
+    also holds the PKCE ``code_verifier`` until the callback.
+    """
+
+    def __init__(self, secret: str, store: StateStoreBackend, ttl: int = 600):
+        self._key = hmac.new(secret.encode(), b"oauth-state", hashlib.sha256).digest()
+        self.store = store
+        self.ttl = ttl
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    @staticmethod
+    def new_binding() -> str:
+        """A fresh browser binding secret, to be kept in the ``BINDING_COOKIE`` cookie."""
+        return secrets.token_urlsafe(16)
+
+    def issue(self, provider: str, binding: str, pkce: bool = False) -> Tuple[str, str]:
+        """A signed state for ``provider``, bound to the browser holding ``binding``, and its nonce."""
+        if not binding:
+            raise ValueError("An OAuth state must be bound to a browser")
+        nonce = secrets.token_urlsafe(16)
+        claims = {"p": provider, "n": nonce, "t": round(time.time(), 3), "b": self._sign(f"binding:{binding}")}
+        if pkce:
+            claims["c"] = 1
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{payload}.{self._sign(payload)}", nonce
+
+    async def start(self, provider: str, binding: str, pkce: bool = False) -> Tuple[str, Optional[str]]:
+        """A state for a new login and, with ``pkce``, the S256 ``code_challenge`` to send with it."""
+        state, nonce = self.issue(provider, binding, pkce)
+        if not pkce:
+            return state, None
+        verifier = secrets.token_urlsafe(48)
+        await self.store.put(f"pkce:{nonce}", verifier, time.time() + self.ttl)
+        return state, _b64encode(hashlib.sha256(verifier.encode()).digest())
+
+    async def consume(self, state: Optional[str], provider: str, binding: Optional[str]) -> Optional[str]:
+        """Check ``state`` for a callback and mark it used; returns the PKCE verifier, if any.
+
+        ``binding`` is the secret from the callback request's cookie. Raises
+        ``InvalidStateError`` (400) when the state is missing, forged, for
+        another provider, expired, issued to another browser or already used.
+        """
+        if not state:
+            raise InvalidStateError("missing")
+        payload, _, mac = state.partition(".")
+        if not hmac.compare_digest(mac.encode(), self._sign(payload).encode()):
+            raise InvalidStateError("bad signature")
+        try:
+            claims = json.loads(_b64decode(payload))
+            provider_name, nonce, issued_at = claims["p"], str(claims["n"]), float(claims["t"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidStateError("malformed")
+        if provider_name != provider:
+            raise InvalidStateError("wrong provider")
+        expires_at = issued_at + self.ttl
+        now = time.time()
+        if expires_at <= now or issued_at > now + CLOCK_SKEW:
+            raise InvalidStateError("expired")
+        bound_to = str(claims.get("b", "")).encode()
+        if not binding or not hmac.compare_digest(bound_to, self._sign(f"binding:{binding}").encode()):
+            raise InvalidStateError("issued to another browser")
+        if not await self.store.add(f"used:{nonce}", expires_at):
+            raise InvalidStateError("already used")
+        if not claims.get("c"):
+            return None
+        verifier = await self.store.pop(f"pkce:{nonce}")
+        if verifier is None:
+            raise InvalidStateError("unknown PKCE verifier")
+        return verifier
+
+
+def build_state_store() -> StateStoreBackend:
+    backend = settings.OAUTH_STATE_BACKEND
+    if backend == "memory":
+        return InMemoryStateStore(max_size=settings.OAUTH_STATE_CACHE_SIZE)
+    if backend == "redis":
+        try:
+            from redis.asyncio import from_url
+        except ImportError:
+            raise RuntimeError("OAUTH_STATE_BACKEND=redis requires the 'redis' package")
+        if not settings.OAUTH_STATE_REDIS_URL:
+            raise RuntimeError("OAUTH_STATE_BACKEND=redis requires OAUTH_STATE_REDIS_URL")
+        return RedisStateStore(from_url(settings.OAUTH_STATE_REDIS_URL))
+    raise ValueError(f"Unsupported OAuth state backend: {backend}")
+
+
+oauth_state = OAuthStateManager(settings.SECRET_KEY, build_state_store(), ttl=settings.OAUTH_STATE_TTL)
@@ -0,0 +1,150 @@
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+sql_queries_per_request = metrics.histogram(
+    "sql_queries_per_request", "SQL statements executed per traced request.", buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+)
+sql_slow_queries_total = metrics.counter("sql_slow_queries_total", "Statements slower than SQL_SLOW_QUERY_MS.")
+sql_budget_exceeded_total = metrics.counter(
+    "sql_query_budget_exceeded_total", "Requests that ran more statements than SQL_QUERY_BUDGET."
+)
+sql_repeated_statements_total = metrics.counter(
+    "sql_repeated_statements_total", "Requests that repeated one statement shape (likely N+1)."
+)
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    parameter_shape: str
+    duration_ms: float
+
+
+@dataclass
+class QueryTrace:
+    """Statements run on behalf of one request (or one ``trace_queries`` block)."""
+
+    label: str
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(query.duration_ms for query in self.queries)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes executed at least ``threshold`` times."""
+        counts = StatementCounter(query.statement for query in self.queries)
+        return {statement: count for statement, count in counts.items() if count >= threshold}
+
+
+_current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+# Traces that see every statement regardless of context; used by ``trace_queries``
+# because test clients run the app on another thread.
+_captures: List[QueryTrace] = []
+
+
+def parameter_shape(parameters) -> str:
+    """Types of the bound parameters, never their values."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    trace = _current_trace.get()
+    if trace is None and not _captures:
+        return
+    record = QueryRecord(" ".join(statement.split()), parameter_shape(parameters), duration_ms)
+    if trace is not None:
+        trace.queries.append(record)
+    for capture in _captures:
+        capture.queries.append(record)
+    if duration_ms >= settings.SQL_SLOW_QUERY_MS:
+        sql_slow_queries_total.inc()
+        label = trace.label if trace is not None else "untraced"
+        logger.warning(
+            f"Slow query ({duration_ms:.1f} ms) in {label}: {record.statement} params={record.parameter_shape}"
+        )
+
+
+def instrument_engine(engine) -> None:
+    """Attach the tracing listeners to a sync ``Engine``; safe to call more than once."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def report(trace: QueryTrace) -> None:
+    """Record per-request metrics and warn about budget overruns and repeated statements."""
+    sql_queries_per_request.observe(trace.count)
+    if trace.count > settings.SQL_QUERY_BUDGET:
+        sql_budget_exceeded_total.inc()
+        logger.warning(
+            f"{trace.label} ran {trace.count} queries ({trace.total_ms:.1f} ms), over the budget of {settings.SQL_QUERY_BUDGET}"
+        )
+    repeated = trace.repeated(settings.SQL_REPEAT_THRESHOLD)
+    if repeated:
+        sql_repeated_statements_total.inc()
+        for statement, count in repeated.items():
+            logger.warning(f"{trace.label} ran the same statement {count} times (possible N+1): {statement}")
+
+
+@contextmanager
+def trace_queries(*engines):
+    """Collect every statement run while the block is active, e.g. to assert a query count in tests."""
+    if not engines:
+        from app.db import async_engine, engine
+
+        engines = (engine,) + ((async_engine.sync_engine,) if async_engine is not None else ())
+    for engine in engines:
+        instrument_engine(engine)
+    trace = QueryTrace("trace_queries")
+    _captures.append(trace)
+    try:
+        yield trace
+    finally:
+        _captures.remove(trace)
+
+
+class QueryTraceMiddleware:
+    """ASGI middleware that attributes statements to the current request and reports on it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = QueryTrace(f"{scope['method']} {scope['path']}")
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_trace.reset(token)
+            report(trace)
@@ -0,0 +1,177 @@
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+rate_limited_total = metrics.counter(
+    "rate_limited_total", "Requests rejected by a rate limit, by limiter and key type.", ("limiter", "key")
+)
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def sliding_count(previous: int, current: int, elapsed: float, window: float) -> float:
+    """Sliding-window estimate from two fixed windows: the previous one weighted by how much of it still overlaps."""
+    return previous * (1 - elapsed / window) + current
+
+
+class RateLimitBackend(ABC):
+    """Approximate sliding-window counters: two integers per key, O(1) per hit."""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        """Count one attempt for ``key``; ``None`` if allowed, else seconds to wait."""
+        pass
+
+    @abstractmethod
+    async def reset(self, key: str, window: float) -> None:
+        pass
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process counters bounded to ``max_size`` keys.
+
+    The least recently used key is dropped when full. That forgets its count,
+    so under a flood of distinct keys limits err towards allowing requests,
+    never towards unbounded memory. Rejected attempts are not counted, so a
+    key under attack is let through again as soon as its window slides.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        # key -> [window number, count in that window, count in the window before]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        now = time.monotonic()
+        number, elapsed = divmod(now, window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [number, 0, 0]
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+                if entry[0] != number:
+                    entry[2] = entry[1] if entry[0] == number - 1 else 0
+                    entry[0], entry[1] = number, 0
+            if sliding_count(entry[2], entry[1] + 1, elapsed, window) > limit:
+                return window - elapsed
+            entry[1] += 1
+        return None
+
+    async def reset(self, key: str, window: float) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Shared counters on any client exposing redis-py's asyncio ``pipeline``, ``incr`` and ``get``.
+
+    One round trip per hit. Unlike the in-memory backend every attempt is
+    counted, rejected ones included, since checking first would need a script.
+    """
+
+    def __init__(self, client, prefix: str = "auth:rate:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _keys(self, key: str, number: int) -> Tuple[str, str]:
+        return f"{self.prefix}{key}:{number}", f"{self.prefix}{key}:{number - 1}"
+
+    async def hit(self, key: str, limit: int, window: float) -> Optional[float]:
+        number, elapsed = divmod(time.time(), window)
+        current_key, previous_key = self._keys(key, int(number))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, math.ceil(window * 2))
+        pipe.get(previous_key)
+        current, _, previous = await pipe.execute()
+        if sliding_count(int(previous or 0), int(current), elapsed, window) > limit:
+            return window - elapsed
+        return None
+
+    async def reset(self, key: str, window: float) -> None:
+        await self.client.delete(*self._keys(key, int(time.time() // window)))
+
+
+class LoginRateLimiter:
+    """Throttles login attempts per email and per client IP before any password is hashed.
+
+    A successful login clears its email's counter, so only failures add up
+    against an account; the per-IP limit counts every attempt.
+    """
+
+    def __init__(self, backend: RateLimitBackend, per_email: int = 10, per_ip: int = 100, window: float = 60.0, enabled: bool = True):
+        self.backend = backend
+        self.per_email = per_email
+        self.per_ip = per_ip
+        self.window = window
+        self.enabled = enabled
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"login:email:{email.strip().lower()}"
+
+    async def check(self, email: str, client_ip: Optional[str]) -> None:
+        """Count an attempt, raising ``RateLimitExceeded`` (429) when a limit is hit."""
+        if not self.enabled:
+            return
+        checks = []
+        if client_ip is not None and self.per_ip > 0:
+            checks.append(("ip", f"login:ip:{client_ip}", self.per_ip))
+        if self.per_email > 0:
+            checks.append(("email", self._email_key(email), self.per_email))
+        for kind, key, limit in checks:
+            retry_after = await self.backend.hit(key, limit, self.window)
+            if retry_after is not None:
+                rate_limited_total.labels("login", kind).inc()
+                logger.warning(f"Login rate limit reached for {kind} {key.rsplit(':', 1)[-1][:5]}****")
+                raise RateLimitExceeded(retry_after)
+
+    async def succeeded(self, email: str) -> None:
+        if self.enabled and self.per_email > 0:
+            await self.backend.reset(self._email_key(email), self.window)
+
+
+def build_rate_limit_backend() -> RateLimitBackend:
+    backend = settings.RATE_LIMIT_BACKEND
+    if backend == "memory":
+        return InMemoryRateLimitBackend(max_size=settings.RATE_LIMIT_CACHE_SIZE)
+    if backend == "redis":
+        try:
+            from redis.asyncio import from_url
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        if not settings.RATE_LIMIT_REDIS_URL:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires RATE_LIMIT_REDIS_URL")
+        return RedisRateLimitBackend(from_url(settings.RATE_LIMIT_REDIS_URL))
+    raise ValueError(f"Unsupported rate limit backend: {backend}")
+
+
+login_rate_limiter = LoginRateLimiter(
+    build_rate_limit_backend(),
+    per_email=settings.LOGIN_RATE_LIMIT_PER_EMAIL,
+    per_ip=settings.LOGIN_RATE_LIMIT_PER_IP,
+    window=settings.LOGIN_RATE_LIMIT_WINDOW,
+    enabled=settings.LOGIN_RATE_LIMIT_ENABLED,
+)
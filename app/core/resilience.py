@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+oauth_retries_total = metrics.counter(
+    "oauth_retries_total", "Outbound provider requests retried after a failure.", ("provider",)
+)
+oauth_hedged_requests_total = metrics.counter(
+    "oauth_hedged_requests_total", "Backup requests sent because the first one was slow.", ("provider",)
+)
+oauth_circuit_rejections_total = metrics.counter(
+    "oauth_circuit_rejections_total", "Provider calls rejected while the circuit was open.", ("provider",)
+)
+oauth_circuit_state = metrics.gauge(
+    "oauth_circuit_state", "Circuit breaker state per provider: 0 closed, 1 half-open, 2 open.", ("provider",)
+)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(HTTPException):
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{provider} is temporarily unavailable, please retry shortly.",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+class RetryableResponse(Exception):
+    """A response whose status says the request may succeed if repeated."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive failures.
+
+    Once ``reset_timeout`` seconds have passed, a single trial call is let
+    through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def before_call(self) -> bool:
+        """Raise ``CircuitOpenError`` unless a call may go through now; ``True`` if it is the half-open trial."""
+        if self.state == self.CLOSED:
+            return False
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit for {self.name} is half-open, allowing a trial request")
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        oauth_circuit_rejections_total.labels(self.name).inc()
+        raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Free the trial slot of a call that ended without an outcome, e.g. because it was cancelled."""
+        self._trial_in_flight = False
+
+
+class ProviderResilience:
+    """Circuit breaker, jittered retries and optional hedging for one provider's outbound calls."""
+
+    def __init__(
+        self,
+        provider: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 1.0,
+        hedge_delay: float = 0.0,
+        breaker: CircuitBreaker = None,
+    ):
+        self.provider = provider
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker(provider)
+        oauth_circuit_state.set_function(lambda: self.breaker.state, provider)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def _send_once(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        response = await send()
+        if response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500:
+            raise RetryableResponse(response)
+        return response
+
+    async def _send_hedged(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Send a backup request if the first has not answered within ``hedge_delay``; first success wins."""
+        first = asyncio.ensure_future(self._send_once(send))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+        oauth_hedged_requests_total.labels(self.provider).inc()
+        pending = {first, asyncio.ensure_future(self._send_once(send))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]], idempotent: bool = False) -> httpx.Response:
+        """Run ``send`` under the breaker; idempotent requests are retried and may be hedged.
+
+        Returns the last response, including retryable error responses, once
+        the attempts are used up; raises the last transport error otherwise.
+        """
+        trial = self.breaker.before_call()
+        attempts = self.max_attempts if idempotent else 1
+        try:
+            for attempt in range(1, attempts + 1):
+                try:
+                    if idempotent and self.hedge_delay > 0:
+                        response = await self._send_hedged(send)
+                    else:
+                        response = await self._send_once(send)
+                except (httpx.TimeoutException, httpx.TransportError, RetryableResponse) as e:
+                    if attempt == attempts:
+                        self.breaker.record_failure()
+                        if isinstance(e, RetryableResponse):
+                            return e.response
+                        raise
+                    oauth_retries_total.labels(self.provider).inc()
+                    logger.warning(f"{self.provider} request failed ({e!r}), retrying ({attempt}/{attempts - 1})")
+                    await asyncio.sleep(self.backoff(attempt))
+                    continue
+                self.breaker.record_success()
+                return response
+        finally:
+            # Cancellation, during a request or a backoff, says nothing about the
+            # provider; without this the circuit would stay half-open for good.
+            if trial:
+                self.breaker.release_trial()
+
+
+_resilience: Dict[str, ProviderResilience] = {}
+
+
+def resilience_for(provider: str) -> ProviderResilience:
+    """Shared resilience state for ``provider``, configured from settings."""
+    resilience = _resilience.get(provider)
+    if resilience is None:
+        resilience = _resilience[provider] = ProviderResilience(
+            provider,
+            max_attempts=settings.OAUTH_RETRY_ATTEMPTS,
+            base_delay=settings.OAUTH_RETRY_BASE_DELAY,
+            max_delay=settings.OAUTH_RETRY_MAX_DELAY,
+            hedge_delay=settings.OAUTH_HEDGE_DELAY,
+            breaker=CircuitBreaker(
+                provider,
+                failure_threshold=settings.OAUTH_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.OAUTH_BREAKER_RESET_TIMEOUT,
+            ),
+        )
+    return resilience
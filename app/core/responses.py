@@ -0,0 +1,29 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for plain dicts the app built itself.
+
+    Returning a ``Response`` makes FastAPI skip validating and serializing the
+    content against the route's ``response_model``, which then only documents
+    the shape. Use it where the content cannot be invalid, such as tokens we
+    just issued, and keep returning models or ORM objects everywhere else.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
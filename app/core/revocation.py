@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+from app.config import settings
+from app.core.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationIndex:
+    """Revoked session ids, checked on every authenticated request without a DB query.
+
+    A Bloom filter answers "certainly not revoked" for almost every token, and
+    an exact dict of session id -> revocation time (naive UTC) confirms its
+    positives. Revocations only matter while access tokens issued before them
+    can still be valid, so entries older than ``window`` are dropped whenever
+    the index is rebuilt from the database.
+    """
+
+    def __init__(self, window: timedelta, capacity: int = 100000, error_rate: float = 0.001):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._revoked: Dict[str, datetime] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self._bloom and session_id in self._revoked
+
+    def revoke(self, session_id: str, at: datetime = None) -> None:
+        """Record a revocation made by this process, effective immediately."""
+        with self._lock:
+            self._revoked[session_id] = at or datetime.utcnow()
+            if self._bloom.count >= self.capacity:
+                self._rebuild(self._revoked)
+            else:
+                self._bloom.add(session_id)
+
+    def replace(self, revoked: Iterable[Tuple[str, datetime]]) -> None:
+        """Merge revocations loaded from the database and drop expired ones."""
+        with self._lock:
+            self._rebuild({**self._revoked, **dict(revoked)})
+
+    def _rebuild(self, revoked: Dict[str, datetime]) -> None:
+        cutoff = datetime.utcnow() - self.window
+        live = {session_id: at for session_id, at in revoked.items() if at >= cutoff}
+        # Swap in complete objects so readers never see a half-built filter.
+        self._bloom = BloomFilter.from_items(live, max(self.capacity, len(live) * 2), self.error_rate)
+        self._revoked = live
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    async def sync(self) -> None:
+        from app.db import session_scope
+        from app.repositories import RefreshTokenRepository
+
+        async with session_scope() as db:
+            revoked = await RefreshTokenRepository(db).revoked_since(datetime.utcnow() - self.window)
+        self.replace(revoked)
+
+    async def run(self, interval: float) -> None:
+        """Resync from the database every ``interval`` seconds, picking up other nodes' revocations."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync revoked sessions")
+
+
+revocation_index = RevocationIndex(
+    window=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+)
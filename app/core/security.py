@@ -1,56 +1,115 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Union
 import logging
 import secrets
 import string
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.hashing import get_password_context, password_hash_executor
 from app.config import settings
-from app.db import get_db
-from app.models import User
+from app.core.metrics import timed
+from app.core.revocation import revocation_index
+from app.core.token_cache import verified_token_cache
+from app.core.tokens import InvalidTokenError, token_engine
+from app.core.user_cache import UserSnapshot, user_cache
+from app.db import get_read_db
+from app.repositories import UserRepository
 from app.schemas import TokenData
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+_unusable_password_hash: Optional[str] = None
+
 class SecurityManager:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.ALGORITHM = "HS256"
-        self.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+        self.token_engine = token_engine
+        self.ALGORITHM = token_engine.active_key.algorithm
+        self.ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        self.hash_executor = password_hash_executor
+        self.token_cache = verified_token_cache
+        self.user_cache = user_cache
+        self.revocations = revocation_index
+
+    @property
+    def pwd_context(self) -> CryptContext:
+        """The process-wide context for the configured hashing policy."""
+        return get_password_context()
 
     def get_password_hash(self, password: str) -> str:
-        """Hash a password using bcrypt."""
+        """Hash a password with the configured scheme."""
         return self.pwd_context.hash(password)
 
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a stored hash uses an outdated scheme or cost parameters."""
+        return self.pwd_context.needs_update(hashed_password)
+
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against a hashed password."""
         return self.pwd_context.verify(plain_password, hashed_password)
 
+    @timed("password_hash")
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the hashing executor without blocking the event loop."""
+        return await self.hash_executor.hash(password)
+
+    @timed("password_verify")
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the hashing executor without blocking the event loop."""
+        return await self.hash_executor.verify(plain_password, hashed_password)
+
+    async def unusable_password_hash(self) -> str:
+        """Hash of a discarded random secret, for accounts that only sign in through OAuth.
+
+        Computed once per process so OAuth callbacks do not pay for bcrypt.
+        """
+        global _unusable_password_hash
+        if _unusable_password_hash is None:
+            _unusable_password_hash = await self.hash_password_async(secrets.token_urlsafe(32))
+        return _unusable_password_hash
+
+    @timed("jwt_sign")
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token."""
         to_encode = data.copy()
         expire = datetime.utcnow() + (expires_delta or timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES))
         to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=self.ALGORITHM)
+        return self.token_engine.issue(to_encode)
 
+    @timed("jwt_verify")
     def verify_token(self, token: str) -> Optional[TokenData]:
-        """Verify the JWT token."""
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[self.ALGORITHM])
+        """Verify the JWT token, skipping signature checks for recently verified tokens.
+
+        Tokens from a revoked session are rejected, cached or not.
+        """
+        token_data = self.token_cache.get(token)
+        if token_data is None:
+            try:
+                payload = self.token_engine.verify(token)
+            except InvalidTokenError:
+                return None
             email: str = payload.get("sub")
-            return TokenData(email=email) if email else None
-        except JWTError:
+            if not email:
+                return None
+            token_data = TokenData(email=email, session_id=payload.get("sid"))
+            if payload.get("exp") is not None:
+                self.token_cache.put(token, token_data, payload["exp"])
+        if token_data.session_id is not None and self.revocations.is_revoked(token_data.session_id):
             return None
+        return token_data
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-        """Fetch the current user based on the token."""
+    def invalidate_user_tokens(self, email: str) -> None:
+        """Forget cached verifications for a user, e.g. after deactivation."""
+        self.token_cache.invalidate_subject(email)
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Union[Session, AsyncSession] = Depends(get_read_db)) -> UserSnapshot:
+        """Fetch a snapshot of the current user based on the token."""
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -59,8 +118,10 @@ class SecurityManager:
         token_data = self.verify_token(token)
         if not token_data:
             raise credentials_exception
-        user = db.query(User).filter(User.email == token_data.email).first()
-        if not user:
+        user = await self.user_cache.get_or_load(
+            token_data.email, lambda: UserRepository(db).get_by_email(token_data.email)
+        )
+        if not user or not user.is_active:
             raise credentials_exception
         return user
 
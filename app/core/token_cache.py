@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.config import settings
+from app.schemas import TokenData
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of access tokens whose signature has already been checked.
+
+    Entries are keyed by the SHA-256 digest of the token, so raw bearer tokens
+    are never kept in memory, and expire at the token's own ``exp`` claim. A
+    single lock guards the structure; it is held only for dictionary
+    operations, so it is safe to use from both the event loop and threadpool
+    workers.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, TokenData]]" = OrderedDict()
+        self._by_subject: Dict[str, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[TokenData]:
+        if self.max_size <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, token_data = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token_data
+
+    def put(self, token: str, token_data: TokenData, expires_at: float) -> None:
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, token_data)
+            self._entries.move_to_end(key)
+            self._by_subject.setdefault(token_data.email, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: bytes) -> None:
+        _, token_data = self._entries.pop(key)
+        keys = self._by_subject.get(token_data.email)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_subject[token_data.email]
+
+    def invalidate_subject(self, email: str) -> int:
+        """Drop every cached token issued to ``email``; returns how many were removed."""
+        with self._lock:
+            keys = self._by_subject.pop(email, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_subject.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+verified_token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_SIZE)
@@ -0,0 +1,261 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SYMMETRIC_ALGORITHMS = ("HS256",)
+ASYMMETRIC_ALGORITHMS = ("ES256", "EdDSA")
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is malformed, expired, signed with an unknown key or tampered with."""
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json_dumps(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    signing_key: Any
+    verification_key: Any
+
+    @property
+    def is_asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+
+def load_signing_key(kid: str, algorithm: str, material: str) -> SigningKey:
+    """Build a key from a shared secret (HS256) or a PEM private key / path to one."""
+    if algorithm in SYMMETRIC_ALGORITHMS:
+        return SigningKey(kid, algorithm, material, material)
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Unsupported JWT algorithm: {algorithm}")
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+    pem = material if material.lstrip().startswith("-----BEGIN") else open(os.path.expanduser(material)).read()
+    private_key = load_pem_private_key(pem.encode(), password=None)
+    return SigningKey(kid, algorithm, private_key, private_key.public_key())
+
+
+class TokenBackend(ABC):
+    name: str
+    algorithms: Tuple[str, ...]
+
+    @abstractmethod
+    def encode(self, claims: dict, key: SigningKey) -> str:
+        pass
+
+    @abstractmethod
+    def decode(self, token: str, key: SigningKey) -> dict:
+        """Verify ``token`` against ``key`` and return its claims, raising InvalidTokenError."""
+        pass
+
+
+class JoseBackend(TokenBackend):
+    name = "jose"
+    algorithms = ("HS256", "ES256")
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+        self._pems: Dict[Tuple[str, bool], Any] = {}
+
+    def _pem(self, key: SigningKey, private: bool) -> Any:
+        """python-jose wants PEM rather than key objects; serialize once per key."""
+        material = key.signing_key if private else key.verification_key
+        if isinstance(material, str):
+            return material
+        pem = self._pems.get((key.kid, private))
+        if pem is None:
+            from cryptography.hazmat.primitives import serialization
+
+            if private:
+                pem = material.private_bytes(
+                    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+                )
+            else:
+                pem = material.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+            self._pems[(key.kid, private)] = pem
+        return pem
+
+    def encode(self, claims: dict, key: SigningKey) -> str:
+        return self._jwt.encode(claims, self._pem(key, True), algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def decode(self, token: str, key: SigningKey) -> dict:
+        try:
+            return self._jwt.decode(token, self._pem(key, False), algorithms=[key.algorithm])
+        except self._error as e:
+            raise InvalidTokenError(str(e))
+
+
+class PyJWTBackend(TokenBackend):
+    name = "pyjwt"
+    algorithms = ("HS256", "ES256", "EdDSA")
+
+    def __init__(self):
+        import jwt
+
+        self._jwt = jwt
+
+    def encode(self, claims: dict, key: SigningKey) -> str:
+        return self._jwt.encode(claims, key.signing_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def decode(self, token: str, key: SigningKey) -> dict:
+        try:
+            return self._jwt.decode(token, key.verification_key, algorithms=[key.algorithm])
+        except self._jwt.PyJWTError as e:
+            raise InvalidTokenError(str(e))
+
+
+class HS256Backend(TokenBackend):
+    """Minimal HS256 implementation with a precomputed HMAC state and header per key."""
+
+    name = "hs256"
+    algorithms = ("HS256",)
+
+    def __init__(self):
+        self._prepared: Dict[str, Tuple[Any, bytes]] = {}
+
+    def _prepare(self, key: SigningKey) -> Tuple[Any, bytes]:
+        prepared = self._prepared.get(key.kid)
+        if prepared is None:
+            mac = hmac.new(key.signing_key.encode(), digestmod=hashlib.sha256)
+            header = _b64encode(_json_dumps({"alg": "HS256", "typ": "JWT", "kid": key.kid}))
+            prepared = self._prepared[key.kid] = (mac, header)
+        return prepared
+
+    def encode(self, claims: dict, key: SigningKey) -> str:
+        mac, header = self._prepare(key)
+        signing_input = header + b"." + _b64encode(_json_dumps(claims))
+        signature = mac.copy()
+        signature.update(signing_input)
+        return (signing_input + b"." + _b64encode(signature.digest())).decode()
+
+    def decode(self, token: str, key: SigningKey) -> dict:
+        mac, _ = self._prepare(key)
+        signing_input, _, signature = token.rpartition(".")
+        expected = mac.copy()
+        expected.update(signing_input.encode())
+        try:
+            valid = hmac.compare_digest(_b64decode(signature), expected.digest())
+            claims = json.loads(_b64decode(signing_input.partition(".")[2])) if valid else None
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        if not valid:
+            raise InvalidTokenError("Signature verification failed")
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("Malformed token")
+        exp = claims.get("exp")
+        if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+            raise InvalidTokenError("Signature has expired")
+        return claims
+
+
+BACKENDS = {backend.name: backend for backend in (JoseBackend, PyJWTBackend, HS256Backend)}
+
+
+class TokenEngine:
+    """Issues and verifies JWTs with a pluggable backend and a ``kid``-indexed key ring.
+
+    Every key in the ring is accepted for verification; only ``active_kid``
+    signs new tokens, so keys can be rotated by adding a new one, switching the
+    active kid and removing the old key once its tokens have expired.
+    """
+
+    def __init__(self, backend: TokenBackend, keys: List[SigningKey], active_kid: str):
+        self.backend = backend
+        self.keys = {key.kid: key for key in keys}
+        if active_kid not in self.keys:
+            raise ValueError(f"Active JWT key '{active_kid}' is not in the key ring")
+        for key in keys:
+            if key.algorithm not in backend.algorithms:
+                raise ValueError(f"JWT backend '{backend.name}' does not support {key.algorithm}")
+        self.active_key = self.keys[active_kid]
+
+    def issue(self, claims: dict) -> str:
+        claims = {
+            name: calendar.timegm(value.utctimetuple()) if isinstance(value, datetime) else value
+            for name, value in claims.items()
+        }
+        return self.backend.encode(claims, self.active_key)
+
+    def verify(self, token: str) -> dict:
+        try:
+            header = json.loads(_b64decode(token.partition(".")[0]))
+        except ValueError:
+            raise InvalidTokenError("Malformed token header")
+        if not isinstance(header, dict):
+            raise InvalidTokenError("Malformed token header")
+        kid = header.get("kid")
+        if kid is not None and not isinstance(kid, str):
+            raise InvalidTokenError("Malformed token header")
+        # Tokens issued before key rotation existed carry no kid.
+        key = self.keys.get(kid or self.active_key.kid)
+        if key is None:
+            raise InvalidTokenError("Unknown signing key")
+        if header.get("alg") != key.algorithm:
+            raise InvalidTokenError("Unexpected signing algorithm")
+        return self.backend.decode(token, key)
+
+    def jwks(self) -> dict:
+        """Public keys in JWK Set format, for services that verify tokens without the secret."""
+        return {"keys": [_public_jwk(key) for key in self.keys.values() if key.is_asymmetric]}
+
+
+def _public_jwk(key: SigningKey) -> dict:
+    from cryptography.hazmat.primitives import serialization
+
+    public_key = key.verification_key
+    if key.algorithm == "EdDSA":
+        raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "x": _b64encode(raw).decode(), "kid": key.kid, "alg": "EdDSA", "use": "sig"}
+    numbers = public_key.public_numbers()
+    return {
+        "kty": "EC",
+        "crv": "P-256",
+        "x": _b64encode(numbers.x.to_bytes(32, "big")).decode(),
+        "y": _b64encode(numbers.y.to_bytes(32, "big")).decode(),
+        "kid": key.kid,
+        "alg": "ES256",
+        "use": "sig",
+    }
+
+
+def build_token_engine() -> TokenEngine:
+    if not settings.JWT_KEYS and settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"JWT_ALGORITHM={settings.JWT_ALGORITHM} requires private keys in JWT_KEYS")
+    key_material = settings.JWT_KEYS or {settings.JWT_ACTIVE_KID: settings.SECRET_KEY}
+    keys = [load_signing_key(kid, settings.JWT_ALGORITHM, material) for kid, material in key_material.items()]
+    try:
+        backend = BACKENDS[settings.JWT_BACKEND]()
+    except KeyError:
+        raise ValueError(f"Unsupported JWT backend: {settings.JWT_BACKEND}")
+    return TokenEngine(backend, keys, settings.JWT_ACTIVE_KID)
+
+
+token_engine = build_token_engine()
@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Immutable copy of the user fields needed to authorize a request."""
+
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(id=user.id, email=user.email, full_name=user.full_name, is_active=bool(user.is_active))
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw) -> "UserSnapshot":
+        return cls(**json.loads(raw))
+
+
+class UserCacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[UserSnapshot]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, snapshot: UserSnapshot, ttl: int) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        pass
+
+
+class InMemoryUserCacheBackend(UserCacheBackend):
+    """Per-process LRU with a fixed TTL per entry."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    async def set(self, key: str, snapshot: UserSnapshot, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisUserCacheBackend(UserCacheBackend):
+    """Shared cache on any client exposing redis-py's asyncio ``get``/``set``/``delete``."""
+
+    def __init__(self, client, prefix: str = "auth:user:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[UserSnapshot]:
+        raw = await self.client.get(self.prefix + key)
+        return UserSnapshot.from_json(raw) if raw is not None else None
+
+    async def set(self, key: str, snapshot: UserSnapshot, ttl: int) -> None:
+        await self.client.set(self.prefix + key, snapshot.to_json(), ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+
+class UserCache:
+    """Read-through cache of ``UserSnapshot`` objects keyed by email."""
+
+    def __init__(self, backend: Optional[UserCacheBackend], ttl: int = 300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, email: str, loader: Callable[[], Awaitable]) -> Optional[UserSnapshot]:
+        """Return the cached snapshot for ``email`` or build one from ``loader()``."""
+        if self.backend is not None:
+            snapshot = await self.backend.get(email)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        user = await loader()
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        if self.backend is not None:
+            await self.backend.set(email, snapshot, self.ttl)
+        return snapshot
+
+    async def invalidate(self, email: str) -> None:
+        if self.backend is not None:
+            await self.backend.delete(email)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def build_user_cache_backend() -> Optional[UserCacheBackend]:
+    backend = settings.USER_CACHE_BACKEND
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryUserCacheBackend(max_size=settings.USER_CACHE_SIZE)
+    if backend == "redis":
+        try:
+            from redis.asyncio import from_url
+        except ImportError:
+            raise RuntimeError("USER_CACHE_BACKEND=redis requires the 'redis' package")
+        if not settings.USER_CACHE_REDIS_URL:
+            raise RuntimeError("USER_CACHE_BACKEND=redis requires USER_CACHE_REDIS_URL")
+        return RedisUserCacheBackend(from_url(settings.USER_CACHE_REDIS_URL))
+    raise ValueError(f"Unsupported user cache backend: {backend}")
+
+
+user_cache = UserCache(build_user_cache_backend(), ttl=settings.USER_CACHE_TTL)
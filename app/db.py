@@ -1,26 +1,171 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from databases import Database
+from sqlalchemy.pool import StaticPool
 from app.config import settings
+from app.core.query_trace import instrument_engine
 
 DATABASE_URL = settings.DATABASE_URL
+DATABASE_READ_URL = settings.DATABASE_READ_URL or DATABASE_URL
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto the matching asyncio driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername != backend or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(url: str) -> dict:
+    """Pool keyword arguments for ``create_engine`` / ``create_async_engine``."""
+    parsed = make_url(url)
+    if _is_memory_sqlite(parsed):
+        # Every connection to ":memory:" is a separate database, so share one.
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+def _configure_connection(backend: str, read_only: bool):
+    """Connect-event hook applying per-connection PRAGMAs / session settings."""
+    statements = []
+    if backend == "sqlite":
+        if settings.SQLITE_WAL:
+            statements.append("PRAGMA journal_mode=WAL")
+        statements += [
+            f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+            f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+            f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        ]
+        if read_only:
+            statements.append("PRAGMA query_only=ON")
+    elif backend == "postgresql":
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            statements.append(f"SET statement_timeout = {settings.DB_STATEMENT_TIMEOUT_MS}")
+        if read_only:
+            statements.append("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+    elif backend == "mysql":
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            statements.append(f"SET SESSION max_execution_time = {settings.DB_STATEMENT_TIMEOUT_MS}")
+        if read_only:
+            statements.append("SET SESSION TRANSACTION READ ONLY")
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+def create_db_engine(url: str, read_only: bool = False):
+    db_engine = create_engine(url, **engine_options(url))
+    event.listen(db_engine, "connect", _configure_connection(make_url(url).get_backend_name(), read_only))
+    return db_engine
+
+def create_async_db_engine(url: str, read_only: bool = False):
+    db_engine = create_async_engine(url, **engine_options(url))
+    event.listen(db_engine.sync_engine, "connect", _configure_connection(make_url(url).get_backend_name(), read_only))
+    return db_engine
+
+engine = create_db_engine(DATABASE_URL)
+# Like the async sessions, committed objects stay loaded: handlers read them
+# on the event loop, where a lazy refresh would block waiting for a connection.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Lookup-only paths (login, current-user resolution) can use a separate
+# read-only pool so they never queue behind writers for a connection.
+read_engine = create_db_engine(DATABASE_READ_URL, read_only=True) if settings.DB_READ_POOL_ENABLED else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+
+# The asyncio driver is only imported when it is actually used.
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL) if settings.DB_MODE == "async" else None
+async_read_engine = (
+    create_async_db_engine(
+        to_async_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else ASYNC_DATABASE_URL, read_only=True
+    )
+    if async_engine is not None and settings.DB_READ_POOL_ENABLED else async_engine
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    if async_engine is not None else None
+)
+AsyncReadSessionLocal = (
+    async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    if async_read_engine is not None else None
+)
+
+if settings.SQL_TRACE_ENABLED:
+    for traced_engine in {engine, read_engine}:
+        instrument_engine(traced_engine)
+    for traced_engine in {async_engine, async_read_engine} - {None}:
+        instrument_engine(traced_engine.sync_engine)
 
 class Base(DeclarativeBase):
     """Declarative base class for SQLAlchemy models."""
     pass
 
-database = Database(DATABASE_URL)
-
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def get_sync_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+get_db = get_async_db if settings.DB_MODE == "async" else get_sync_db
+get_read_db = get_async_read_db if settings.DB_MODE == "async" else get_sync_read_db
+
+@asynccontextmanager
+async def session_scope():
+    """Session for work outside a request, such as background tasks, in the configured DB_MODE."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
 def init_db():
-    from app.models import user 
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Apply pending migrations; deployments run ``python -m app.migrations upgrade`` instead."""
+    from app.migrations import upgrade
+    upgrade(engine)
@@ -1,21 +1,70 @@
 # app/main.py
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from app.api.admin import admin_router
 from app.api.auth import auth_router
-from app.db import database, init_db
+from app.config import settings
+from app.core.email_index import email_index
+from app.core.hashing import calibrate_policy, get_policy, password_hash_executor, set_policy
+from app.core.http_client import shared_http_client
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.query_trace import QueryTraceMiddleware
+from app.core.revocation import revocation_index
+from app.core.token_cache import verified_token_cache
+from app.core.user_cache import user_cache
+from app.db import async_engine, async_read_engine, engine, init_db, read_engine
+from app.migrations import check_schema
 from contextlib import asynccontextmanager
+import asyncio
 
 app = FastAPI()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
-    init_db()  
-    await database.connect()
-    
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(init_db)
+    else:
+        check_schema(engine)
+    shared_http_client.start()
+    if settings.PASSWORD_HASH_CALIBRATE:
+        set_policy(await run_in_threadpool(calibrate_policy, get_policy(), settings.PASSWORD_HASH_TARGET_MS))
+    await revocation_index.sync()
+    revocation_sync = asyncio.create_task(revocation_index.run(settings.REVOCATION_SYNC_INTERVAL))
+    await email_index.rebuild()
+    email_index_sync = asyncio.create_task(
+        email_index.run(settings.EMAIL_INDEX_SYNC_INTERVAL, settings.EMAIL_INDEX_REBUILD_INTERVAL)
+    ) if email_index.enabled else None
+
     yield  
 
-    await database.disconnect()
+    revocation_sync.cancel()
+    if email_index_sync is not None:
+        email_index_sync.cancel()
+    await shared_http_client.aclose()
+    for pool in {async_engine, async_read_engine} - {None}:
+        await pool.dispose()
+    for pool in {engine, read_engine}:
+        pool.dispose()
+    password_hash_executor.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_router, prefix="/auth")
+app.include_router(admin_router, prefix="/admin")
+
+if settings.SQL_TRACE_ENABLED:
+    app.add_middleware(QueryTraceMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    for cache_name, cache in (("token", verified_token_cache), ("user", user_cache)):
+        for stat in ("hits", "misses"):
+            metrics.counter(f"{cache_name}_cache_{stat}_total", f"{cache_name.title()} cache lookups ({stat}).").set_function(
+                lambda cache=cache, stat=stat: cache.stats()[stat]
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1 @@
+from .runner import SchemaOutOfDate, check_schema, current_version, latest_version, load_migrations, upgrade
@@ -0,0 +1,39 @@
+"""Schema migrations, run once per deployment rather than by every worker.
+
+    python -m app.migrations upgrade [--target VERSION]
+    python -m app.migrations current
+    python -m app.migrations check
+"""
+import argparse
+import logging
+import sys
+
+from app.db import engine
+from app.migrations import SchemaOutOfDate, check_schema, current_version, latest_version, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subcommands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--target", type=int, help="stop after this version")
+    subcommands.add_parser("current", help="print the applied and latest versions")
+    subcommands.add_parser("check", help="exit non-zero when migrations are pending")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "upgrade":
+        applied = upgrade(engine, args.target)
+        print(f"Applied {applied}" if applied else "Nothing to apply")
+    elif args.command == "current":
+        print(f"current={current_version(engine)} latest={latest_version()}")
+    else:
+        try:
+            print(f"Schema is up to date at version {check_schema(engine)}")
+        except SchemaOutOfDate as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import importlib
+import logging
+import pkgutil
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from app.migrations import versions
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant identifying the migration lock on PostgreSQL.
+ADVISORY_LOCK_KEY = 0x6D6967726174
+
+schema_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class SchemaOutOfDate(RuntimeError):
+    """Raised at startup when the database is behind the migrations shipped with the code."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    # Non-transactional migrations run in autocommit mode, which PostgreSQL
+    # needs for CREATE INDEX CONCURRENTLY.
+    transactional: bool = True
+
+
+def load_migrations() -> List[Migration]:
+    """Migrations in ``app.migrations.versions``, ordered by version."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(
+            version=module.version,
+            name=module_info.name,
+            upgrade=module.upgrade,
+            transactional=getattr(module, "transactional", True),
+        ))
+    migrations.sort(key=lambda migration: migration.version)
+    seen = [migration.version for migration in migrations]
+    if len(seen) != len(set(seen)):
+        raise ValueError(f"Duplicate migration versions: {seen}")
+    return migrations
+
+
+def latest_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version; a single SELECT, 0 when nothing has been applied."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # The version table does not exist yet.
+        return 0
+
+
+def _index_is_valid(conn: Connection, name: str) -> Optional[bool]:
+    """PostgreSQL's ``indisvalid`` for an index, or None when the index does not exist."""
+    return conn.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def create_index(conn: Connection, name: str, table: Table, columns: List[str], unique: bool = False) -> None:
+    """Create an index if it is missing, without blocking writes where the database allows it.
+
+    On PostgreSQL a failed concurrent build leaves an INVALID index behind,
+    which ``IF NOT EXISTS`` would then accept as done; such a leftover is
+    dropped and rebuilt, and a build that still ends up invalid raises.
+    """
+    if conn.dialect.name == "postgresql":
+        if _index_is_valid(conn, name) is False:
+            logger.warning(f"Index {name} is invalid after an earlier failed build; rebuilding it")
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        keyword = "UNIQUE INDEX" if unique else "INDEX"
+        conn.exec_driver_sql(
+            f"CREATE {keyword} CONCURRENTLY IF NOT EXISTS {name} ON {table.name} ({', '.join(columns)})"
+        )
+        if not _index_is_valid(conn, name):
+            raise RuntimeError(f"Index {name} on {table.name} was not built; it is missing or INVALID")
+        return
+    Index(name, *(table.c[column] for column in columns), unique=unique).create(conn, checkfirst=True)
+
+
+def drop_index(conn: Connection, name: str, table: Table, columns: List[str]) -> None:
+    """Drop an index if it exists, concurrently on PostgreSQL."""
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        return
+    Index(name, *(table.c[column] for column in columns)).drop(conn, checkfirst=True)
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Serialize concurrent runners; SQLite serializes DDL on its own."""
+    if engine.dialect.name not in ("postgresql", "mysql"):
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SELECT pg_advisory_lock({ADVISORY_LOCK_KEY})")
+        else:
+            conn.exec_driver_sql("SELECT GET_LOCK('schema_migrations', -1)")
+        try:
+            yield
+        finally:
+            if engine.dialect.name == "postgresql":
+                conn.exec_driver_sql(f"SELECT pg_advisory_unlock({ADVISORY_LOCK_KEY})")
+            else:
+                conn.exec_driver_sql("SELECT RELEASE_LOCK('schema_migrations')")
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to ``target`` (default: latest) and return their versions."""
+    applied = []
+    with _migration_lock(engine):
+        schema_metadata.create_all(engine, checkfirst=True)
+        current = current_version(engine)
+        for migration in load_migrations():
+            if migration.version <= current or (target is not None and migration.version > target):
+                continue
+            logger.info(f"Applying migration {migration.name}")
+            if migration.transactional:
+                with engine.begin() as conn:
+                    migration.upgrade(conn)
+                    conn.execute(insert(schema_version).values(version=migration.version, name=migration.name))
+            else:
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    migration.upgrade(conn)
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(schema_version).values(version=migration.version, name=migration.name))
+                except IntegrityError:
+                    # Another runner recorded it first; the migration itself is idempotent.
+                    pass
+            applied.append(migration.version)
+    return applied
+
+
+def check_schema(engine: Engine) -> int:
+    """Fail fast when the database is behind the code; meant for worker startup."""
+    current, latest = current_version(engine), latest_version()
+    if current < latest:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current} but the application needs {latest}; "
+            "run 'python -m app.migrations upgrade'"
+        )
+    return current
@@ -0,0 +1,42 @@
+"""Users and linked OAuth identities, plus the indexes behind provider-identity lookups.
+
+Tables are created only when missing, so databases created by the former
+``create_all`` startup adopt this migration as their baseline.
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint, func
+from sqlalchemy.engine import Connection
+
+from app.migrations.runner import create_index
+
+version = 1
+transactional = False
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("full_name", String, nullable=True),
+    Column("is_active", Boolean, default=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+user_oauth = Table(
+    "user_oauth",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("oauth_provider", String, nullable=False),
+    Column("oauth_user_id", String, nullable=False),
+    UniqueConstraint("user_id", "oauth_provider"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
+    create_index(conn, "ix_user_oauth_provider_identity", user_oauth, ["oauth_provider", "oauth_user_id"])
+    create_index(conn, "ix_user_oauth_user_id", user_oauth, ["user_id"])
@@ -0,0 +1,27 @@
+"""Make ``(oauth_provider, oauth_user_id)`` unique so a provider identity maps to one account.
+
+Fails, leaving the old index in place, if existing rows link one provider
+identity more than once; those links need to be resolved by hand first.
+The old index is only dropped once the unique one is built and valid, so a
+rerun after such a failure rebuilds it rather than skipping it.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+from app.migrations.runner import create_index, drop_index
+
+version = 2
+transactional = False
+
+user_oauth = Table(
+    "user_oauth",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("oauth_provider", String, nullable=False),
+    Column("oauth_user_id", String, nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    create_index(conn, "uq_user_oauth_provider_identity", user_oauth, ["oauth_provider", "oauth_user_id"], unique=True)
+    drop_index(conn, "ix_user_oauth_provider_identity", user_oauth, ["oauth_provider", "oauth_user_id"])
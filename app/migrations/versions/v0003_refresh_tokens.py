@@ -0,0 +1,29 @@
+"""Refresh tokens, stored as SHA-256 hashes and grouped into rotation families."""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, func
+from sqlalchemy.engine import Connection
+
+version = 3
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+refresh_tokens = Table(
+    "refresh_tokens",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("family_id", String, nullable=False),
+    Column("token_hash", String, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("used_at", DateTime, nullable=True),
+    Column("revoked_at", DateTime, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("uq_refresh_tokens_token_hash", "token_hash", unique=True),
+    Index("ix_refresh_tokens_family_id", "family_id"),
+    Index("ix_refresh_tokens_revoked_at", "revoked_at"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    refresh_tokens.create(conn, checkfirst=True)
@@ -1,3 +1,4 @@
 from .user import User
 from .oauth import UserOAuth
+from .refresh_token import RefreshToken
 
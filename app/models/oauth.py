@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -12,4 +12,8 @@ class UserOAuth(Base):
 
     user = relationship("User", back_populates="oauth_providers")
 
-    __table_args__ = (UniqueConstraint("user_id", "oauth_provider"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "oauth_provider"),
+        Index("uq_user_oauth_provider_identity", "oauth_provider", "oauth_user_id", unique=True),
+        Index("ix_user_oauth_user_id", "user_id"),
+    )
@@ -0,0 +1,2 @@
+from .user import UserRepository
+from .refresh_token import RefreshTokenRepository
@@ -0,0 +1,22 @@
+from typing import Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+class Repository:
+    """Awaitable data access over either a sync ``Session`` or an ``AsyncSession``.
+
+    Sync sessions are driven from the threadpool, so a saturated connection
+    pool never blocks the event loop.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+        self.is_async = isinstance(db, AsyncSession)
+
+    async def _call(self, method: str, *args):
+        if self.is_async:
+            return await getattr(self.db, method)(*args)
+        return await run_in_threadpool(getattr(self.db, method), *args)
@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+
+from app.models import RefreshToken
+from app.repositories.base import Repository
+
+
+class RefreshTokenRepository(Repository):
+    """Refresh token rows, looked up by token hash on the unique index."""
+
+    async def add(self, user_id: int, family_id: str, token_hash: str, expires_at: datetime) -> None:
+        await self._call("execute", insert(RefreshToken).values(
+            user_id=user_id, family_id=family_id, token_hash=token_hash, expires_at=expires_at
+        ))
+        await self._call("commit")
+
+    async def rotate(self, token_hash: str, new_hash: str, expires_at: datetime, now: datetime) -> Optional[Tuple[int, str]]:
+        """Mark a live token used and add its successor in one transaction.
+
+        The conditional UPDATE claims the token, so of two concurrent refreshes
+        with the same token only one succeeds. Returns ``(user_id, family_id)``,
+        or ``None`` when the token is unknown, expired, used or revoked.
+        """
+        claim = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.get_bind().dialect.update_returning:
+            result = await self._call("execute", claim.returning(RefreshToken.user_id, RefreshToken.family_id))
+            claimed = result.first()
+        else:
+            result = await self._call(
+                "execute", select(RefreshToken.user_id, RefreshToken.family_id).where(RefreshToken.token_hash == token_hash)
+            )
+            claimed = result.first()
+            if claimed is not None and (await self._call("execute", claim)).rowcount != 1:
+                claimed = None
+        if claimed is None:
+            await self._call("rollback")
+            return None
+        user_id, family_id = claimed
+        await self._call("execute", insert(RefreshToken).values(
+            user_id=user_id, family_id=family_id, token_hash=new_hash, expires_at=expires_at
+        ))
+        await self._call("commit")
+        return user_id, family_id
+
+    async def get_by_hash(self, token_hash: str) -> Optional[RefreshToken]:
+        result = await self._call("execute", select(RefreshToken).where(RefreshToken.token_hash == token_hash))
+        return result.scalars().first()
+
+    async def revoke_family(self, family_id: str, now: datetime) -> int:
+        result = await self._call(
+            "execute",
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False),
+        )
+        await self._call("commit")
+        return result.rowcount
+
+    async def revoked_since(self, cutoff: datetime) -> List[Tuple[str, datetime]]:
+        """Families revoked at or after ``cutoff``, with their latest revocation time."""
+        result = await self._call(
+            "execute",
+            select(RefreshToken.family_id, func.max(RefreshToken.revoked_at))
+            .where(RefreshToken.revoked_at >= cutoff)
+            .group_by(RefreshToken.family_id),
+        )
+        return [tuple(row) for row in result.all()]
@@ -0,0 +1,154 @@
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from app.models import User, UserOAuth
+from app.repositories.base import Repository
+
+logger = logging.getLogger(__name__)
+
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+class UserRepository(Repository):
+    """Awaitable data access for users and their linked OAuth identities.
+
+    Accepts either a sync ``Session`` or an ``AsyncSession`` so services have a
+    single code path in both ``DB_MODE`` settings.
+    """
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        result = await self._call("execute", select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        result = await self._call("execute", select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+    async def count(self) -> int:
+        return (await self._call("execute", select(func.count()).select_from(User))).scalar()
+
+    async def emails_after(self, last_id: int, limit: int) -> List[Tuple[int, str]]:
+        """``(id, email)`` pairs with ``id > last_id`` in id order; one primary-key range scan per page."""
+        result = await self._call(
+            "execute", select(User.id, User.email).where(User.id > last_id).order_by(User.id).limit(limit)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def list_page(
+        self, limit: int, after_id: int = 0, email_prefix: Optional[str] = None, after_email: Optional[str] = None
+    ) -> List[User]:
+        """One keyset page of users with their OAuth links, in a single query.
+
+        Without ``email_prefix`` pages follow the primary key (which is also
+        creation order) from ``after_id``. With it, they follow ``email`` from
+        ``after_email`` over a range on the email index, instead of a LIKE that
+        not every database can run against that index.
+        """
+        query = select(User).options(joinedload(User.oauth_providers))
+        if email_prefix:
+            upper = email_prefix[:-1] + chr(ord(email_prefix[-1]) + 1)
+            lower = User.email > after_email if after_email is not None else User.email >= email_prefix
+            query = query.where(lower, User.email < upper).order_by(User.email)
+        else:
+            query = query.where(User.id > after_id).order_by(User.id)
+        result = await self._call("execute", query.limit(limit))
+        return list(result.unique().scalars().all())
+
+    async def get_by_provider_identity(self, oauth_provider: str, oauth_user_id: str) -> Optional[User]:
+        """The user linked to a provider account; one read on the unique identity index."""
+        result = await self._call(
+            "execute",
+            select(User)
+            .join(UserOAuth, UserOAuth.user_id == User.id)
+            .where(UserOAuth.oauth_provider == oauth_provider, UserOAuth.oauth_user_id == oauth_user_id),
+        )
+        return result.scalars().first()
+
+    async def get_user_oauth(self, user_id: int, oauth_provider: str) -> Optional[UserOAuth]:
+        result = await self._call(
+            "execute",
+            select(UserOAuth).where(UserOAuth.user_id == user_id, UserOAuth.oauth_provider == oauth_provider),
+        )
+        return result.scalars().first()
+
+    async def update_password_hash(self, user_id: int, old_hash: str, new_hash: str) -> bool:
+        """Swap the stored hash unless the password was changed since ``old_hash`` was read."""
+        result = await self._call(
+            "execute",
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False),
+        )
+        await self._call("commit")
+        return result.rowcount == 1
+
+    async def add(self, instance):
+        """Insert ``instance`` and commit, rolling back and re-raising on IntegrityError."""
+        self.db.add(instance)
+        try:
+            await self._call("commit")
+        except IntegrityError:
+            await self._call("rollback")
+            raise
+        await self._call("refresh", instance)
+        return instance
+
+    @property
+    def supports_upsert(self) -> bool:
+        return self.db.get_bind().dialect.name in UPSERT_DIALECTS
+
+    async def upsert_oauth_user(
+        self,
+        email: str,
+        full_name: Optional[str],
+        hashed_password: str,
+        oauth_provider: Optional[str] = None,
+        oauth_user_id: Optional[str] = None,
+    ) -> User:
+        """Create or fetch the user for ``email`` and link the OAuth identity in one transaction.
+
+        Usually two statements: an ``INSERT .. ON CONFLICT (email)`` that
+        returns the existing or new row, and an ``INSERT .. ON CONFLICT DO
+        NOTHING`` for the provider link, which may already exist under either
+        unique key. Concurrent callbacks for the same account resolve to the
+        same row instead of failing with an IntegrityError. When the link is
+        not inserted, one more read finds out why: the identity may already
+        belong to a user, who is returned, or this user may already have
+        another identity at the provider, which is kept and logged.
+        """
+        insert = UPSERT_DIALECTS[self.db.get_bind().dialect.name]
+        user_stmt = insert(User).values(email=email, full_name=full_name, hashed_password=hashed_password, is_active=True)
+        # A no-op update, unlike DO NOTHING, makes RETURNING yield the existing row.
+        user_stmt = user_stmt.on_conflict_do_update(
+            index_elements=[User.email], set_={"email": user_stmt.excluded.email}
+        ).returning(User).execution_options(populate_existing=True)
+        try:
+            result = await self._call("execute", user_stmt)
+            user = result.scalars().one()
+            if oauth_provider and oauth_user_id:
+                link_stmt = insert(UserOAuth).values(
+                    user_id=user.id, oauth_provider=oauth_provider, oauth_user_id=oauth_user_id
+                ).on_conflict_do_nothing()
+                if (await self._call("execute", link_stmt)).rowcount == 0:
+                    linked_user = await self.get_by_provider_identity(oauth_provider, oauth_user_id)
+                    if linked_user is None:
+                        logger.warning(
+                            f"User {user.id} is already linked to another {oauth_provider} account; "
+                            f"{oauth_provider} user {oauth_user_id} was not linked"
+                        )
+                    else:
+                        user = linked_user
+            await self._call("commit")
+        except IntegrityError:
+            await self._call("rollback")
+            raise
+        return user
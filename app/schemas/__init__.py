@@ -1,6 +1,7 @@
 from .user_create import UserCreate
 from .user_out import UserOut
-from .token import Token, TokenData
+from .token import RefreshRequest, Token, TokenData
 from .login import LoginRequest, LoginResponse
 from .oauth import OAuthURLResponse
 
+from .admin import AdminUserOut, UserPage
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class AdminUserOut(BaseModel):
+    id: int
+    email: str
+    full_name: Optional[str] = None
+    is_active: bool
+    created_at: Optional[datetime] = None
+    oauth_providers: List[str] = []
+
+    @classmethod
+    def from_user(cls, user) -> "AdminUserOut":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+            oauth_providers=sorted(link.oauth_provider for link in user.oauth_providers),
+        )
+
+class UserPage(BaseModel):
+    items: List[AdminUserOut]
+    next_cursor: Optional[str] = None
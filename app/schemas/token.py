@@ -4,6 +4,11 @@ from typing import Optional
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    session_id: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
@@ -1,12 +1,10 @@
 from pydantic import BaseModel, EmailStr, Field, constr, ConfigDict
-from typing import Optional, ClassVar
+from typing import Optional
 
 class UserCreate(BaseModel):
+    model_config = ConfigDict(str_min_length=1, str_strip_whitespace=True)
+
     email: EmailStr
-    password: constr(min_length=8)
+    # Passwords are taken verbatim; login does not strip them either.
+    password: constr(min_length=8, strip_whitespace=False)
     full_name: Optional[str] = Field(None, min_length=1, max_length=100)
-
-    config: ClassVar[ConfigDict] = {
-        "str_min_length": 1,
-        "str_strip_whitespace": True,
-    }
@@ -1,10 +1,10 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional, ClassVar
+from typing import Optional
 
 class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: EmailStr
     full_name: Optional[str] = None
     oauth_provider: Optional[str] = None
-
-    config: ClassVar[ConfigDict] = {"from_attributes": True}
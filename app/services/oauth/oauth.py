@@ -1,46 +1,48 @@
 # app/services/oauth/oauth.py
 
-from fastapi import HTTPException, Path, Query, Depends
-from httpx import AsyncClient
+import asyncio
+import httpx
+from fastapi import HTTPException
 from app.config import settings
 import logging
-from sqlalchemy.orm import Session  
-from app.services.oauth.oauth_providers import GoogleOAuthProvider, GitHubOAuthProvider, LinkedInOAuthProvider
 from app.services.oauth.oauth_base import OAuthProvider
-from app.db import get_db
-from typing import Optional
-from app.models import User, UserOAuth
-from app.core.security import SecurityManager  
-from sqlalchemy.exc import IntegrityError
+from app.services.oauth.oauth_registry import OAuthProviderRegistry
+from app.services.oauth.oidc import OIDCMetadataCache
+from typing import Any, Dict, Optional
+from app.core.http_client import SharedHTTPClient, shared_http_client
+from app.core.metrics import stage_timer, timed
+from app.core.oauth_state import oauth_state
+from app.core.resilience import resilience_for
+from app.core.tokens import InvalidTokenError
 
 logger = logging.getLogger(__name__)
 
-class OAuthProviderFactory:
-    @staticmethod
-    def get_provider(provider: str) -> OAuthProvider:
-        if provider == "google":
-            return GoogleOAuthProvider()
-        elif provider == "github":
-            return GitHubOAuthProvider()
-        elif provider == "linkedin":
-            return LinkedInOAuthProvider()
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported OAuth provider: {provider}")
-
 class OAuthService:
-    @staticmethod
-    async def get_oauth_login_url(provider: str) -> str:
-        oauth_provider = OAuthProviderFactory.get_provider(provider)
-        return (
-            f"{oauth_provider.get_auth_url()}response_type=code&"
-            f"client_id={oauth_provider.client_id}&"
-            f"redirect_uri={oauth_provider.redirect_uri}&"
-            f"scope={oauth_provider.get_scopes()}"
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None, registry: Optional[OAuthProviderRegistry] = None):
+        self.http_client = http_client or shared_http_client
+        self.registry = registry or OAuthProviderRegistry.default(self.http_client)
+        self.oidc = OIDCMetadataCache(self.http_client)
+
+    def get_provider(self, provider: str) -> OAuthProvider:
+        return self.registry.get_provider(provider)
+
+    async def get_oauth_login_url(self, provider: str, state: Optional[str] = None, binding: Optional[str] = None) -> str:
+        """Authorize URL for ``provider``.
+
+        Without an explicit ``state`` a signed one is issued for the browser
+        holding ``binding``, with PKCE where supported.
+        """
+        oauth_provider = self.get_provider(provider)
+        if state is not None:
+            return oauth_provider.build_authorize_url(state)
+        state, code_challenge = await oauth_state.start(
+            oauth_provider.name, binding, pkce=oauth_provider.supports_pkce and settings.OAUTH_PKCE_ENABLED
         )
+        return oauth_provider.build_authorize_url(state, code_challenge)
 
-    @staticmethod
-    async def exchange_code_for_token(provider: str, code: str) -> dict:
-        oauth_provider = OAuthProviderFactory.get_provider(provider)
+    @timed("oauth_token_exchange")
+    async def exchange_code_for_token(self, provider: str, code: str, code_verifier: Optional[str] = None) -> dict:
+        oauth_provider = self.get_provider(provider)
         data = {
             "code": code,
             "client_id": oauth_provider.client_id,
@@ -48,106 +50,79 @@ class OAuthService:
             "redirect_uri": oauth_provider.redirect_uri,
             "grant_type": "authorization_code",
         }
+        if code_verifier is not None:
+            data["code_verifier"] = code_verifier
         headers = oauth_provider.generate_auth_header()
 
-        async with AsyncClient() as client:
-            response = await client.post(oauth_provider.get_token_url(), data=data, headers=headers)
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail=f"Failed to exchange code for token with {provider}: {response.text}")
-
-            try:
-                return response.json()
-            except ValueError:
-                raise HTTPException(status_code=400, detail=f"Invalid response format from {provider}: {response.text}")
-
-    @staticmethod
-    async def get_oauth_user_data(provider: str, token: str) -> dict:
-        oauth_provider = OAuthProviderFactory.get_provider(provider)
-        async with AsyncClient() as client:
-            response = await client.get(oauth_provider.get_user_info_url(), headers={"Authorization": f"Bearer {token}"})
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch user data from {provider}. Status: {response.status_code}, Response: {response.text}")
-                raise HTTPException(status_code=400, detail=f"Failed to fetch user data from {provider}")
-
-            user_data = response.json()
-            logger.info(f"Raw user data from {provider}: {user_data}")
-
-            # Process user data differently based on provider
-            processed_user_data = await oauth_provider.process_user_data(user_data, token) if provider == "github" else oauth_provider.process_user_data(user_data)
-            logger.info(f"Processed user data for {provider}: {processed_user_data}")
-            return processed_user_data
-
-    @staticmethod
-    async def oauth_callback(
-        provider: str = Path(..., description="OAuth provider name"),
-        code: Optional[str] = Query(None, description="Authorization code from the OAuth provider"),
-        db: Session = Depends(get_db)
-    ):
-        if not code:
-            logger.error(f"Missing authorization code for {provider}")
-            raise HTTPException(status_code=400, detail="Authorization code not provided")
-
-        try:
-            token_data = await OAuthService.exchange_code_for_token(provider, code)
-
-            user_data = await OAuthService.get_oauth_user_data(provider, token_data['access_token'])
-
-            logger.info(f"User authenticated via {provider}: {user_data['email'][:5]}****")
-
-            user = await OAuthService.create_or_update_user(db, user_data)
-
-            return OAuthService.create_token_response(user_data["email"])
-
-        except Exception as e:
-            logger.exception(f"Error during OAuth callback for {provider}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to authenticate with {provider}")
-
-    @staticmethod
-    async def create_or_update_user(db: Session, user_data: dict) -> User:
-        oauth_provider = user_data.get("oauth_provider")
-        oauth_user_id = user_data.get("oauth_user_id")
-        email = user_data.get("email")
-        full_name = user_data.get("name")
-
-        user = db.query(User).filter(User.email == email).first()
-
-        if not user:
-            random_password = SecurityManager().generate_random_password(12)
-            hashed_password = SecurityManager().get_password_hash(random_password)  
-            user = User(
-                email=email,
-                full_name=full_name or "OAuth User",
-                hashed_password=hashed_password,
+        # Authorization codes are single-use, so the exchange is never retried.
+        response = await resilience_for(oauth_provider.name).call(
+            lambda: self.http_client.client.post(
+                oauth_provider.get_token_url(), data=data, headers=headers, timeout=oauth_provider.timeout
             )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-
-            logger.info(f"Generated random password for new user: {random_password}")
-
-        if oauth_provider and oauth_user_id:
-            user_oauth = db.query(UserOAuth).filter(
-                UserOAuth.user_id == user.id, UserOAuth.oauth_provider == oauth_provider
-            ).first()
-
-            if not user_oauth:
-                user_oauth = UserOAuth(
-                    user_id=user.id,
-                    oauth_provider=oauth_provider,
-                    oauth_user_id=oauth_user_id
-                )
-                db.add(user_oauth)
-                try:
-                    db.commit()
-                    db.refresh(user_oauth)
-                except IntegrityError as e:
-                    db.rollback()
-                    raise HTTPException(status_code=500, detail="Failed to link OAuth provider")
-
-        return user 
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail=f"Failed to exchange code for token with {provider}: {response.text}")
 
-    @staticmethod
-    def create_token_response(email: str) -> dict:
-        """Return a token response with the generated token and email."""
-        access_token = SecurityManager().create_access_token({"sub": email})
-        return {"access_token": access_token, "token_type": "bearer", "email": email}
+        try:
+            return response.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid response format from {provider}: {response.text}")
+
+    async def _fetch_resource(self, oauth_provider: OAuthProvider, name: str, url: str, token: str):
+        response = await resilience_for(oauth_provider.name).call(
+            lambda: self.http_client.client.get(
+                url, headers={"Authorization": f"Bearer {token}"}, timeout=oauth_provider.timeout
+            ),
+            idempotent=True,
+        )
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch {name} from {oauth_provider.name}. Status: {response.status_code}, Response: {response.text}")
+            raise HTTPException(status_code=400, detail=f"Failed to fetch user data from {oauth_provider.name}")
+        return response.json()
+
+    async def fetch_user_resources(self, oauth_provider: OAuthProvider, token: str) -> Dict[str, Any]:
+        """Fetch every userinfo resource the provider declares concurrently.
+
+        If one request fails or the caller is cancelled, the requests still in
+        flight are cancelled before the error propagates.
+        """
+        resources = oauth_provider.get_user_info_resources()
+        tasks = [
+            asyncio.ensure_future(self._fetch_resource(oauth_provider, name, url, token))
+            for name, url in resources.items()
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return dict(zip(resources, results))
+
+    async def user_data_from_id_token(self, oauth_provider: OAuthProvider, id_token: str, token: str) -> Optional[dict]:
+        """User data from a locally verified ``id_token``, or ``None`` when userinfo is still needed."""
+        try:
+            with stage_timer("oauth_id_token"):
+                claims = await self.oidc.verify_id_token(oauth_provider, id_token, token)
+        except (InvalidTokenError, httpx.HTTPError, KeyError, ValueError) as e:
+            logger.warning(f"Could not verify id_token from {oauth_provider.name}, using userinfo instead: {e!r}")
+            return None
+        return oauth_provider.process_id_token_claims(claims)
+
+    async def get_oauth_user_data(self, provider: str, token: str, id_token: Optional[str] = None) -> dict:
+        oauth_provider = self.get_provider(provider)
+        processed_user_data = None
+        if id_token and oauth_provider.oidc_issuers and settings.OAUTH_OIDC_ENABLED:
+            processed_user_data = await self.user_data_from_id_token(oauth_provider, id_token, token)
+        if processed_user_data is None:
+            with stage_timer("oauth_user_info"):
+                resources = await self.fetch_user_resources(oauth_provider, token)
+            logger.info(f"Raw user data from {provider}: {resources}")
+            processed_user_data = oauth_provider.merge_user_data(resources)
+
+        processed_user_data.setdefault("oauth_provider", oauth_provider.name)
+        if processed_user_data.get("id") is not None:
+            processed_user_data.setdefault("oauth_user_id", str(processed_user_data["id"]))
+        logger.info(f"Processed user data for {provider}: {processed_user_data}")
+        return processed_user_data
@@ -1,11 +1,50 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote, urlencode
+from app.core.http_client import SharedHTTPClient, shared_http_client
 
 class OAuthProvider(ABC):
-    def __init__(self):
+    name: str
+    # OpenID Connect issuer identifiers; the first one is used for discovery.
+    # Providers that set these have their id_token verified locally instead of
+    # calling the userinfo endpoint.
+    oidc_issuers: Tuple[str, ...] = ()
+    # Whether the token endpoint accepts a PKCE ``code_verifier``.
+    supports_pkce: bool = False
+
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None):
         self.client_id = self.get_client_id()
         self.client_secret = self.get_client_secret()
         self.redirect_uri = self.get_redirect_uri()
+        self.http_client = http_client or shared_http_client
+        self.authorize_url = self.get_auth_url() + urlencode(
+            {
+                "response_type": "code",
+                "client_id": self.client_id,
+                "redirect_uri": self.redirect_uri,
+                "scope": self.get_scopes(),
+            },
+            quote_via=quote,
+        )
+
+    def build_authorize_url(self, state: Optional[str] = None, code_challenge: Optional[str] = None) -> str:
+        """Append the per-request ``state`` and PKCE challenge to the precomputed authorize URL."""
+        url = self.authorize_url
+        if state is not None:
+            url = f"{url}&state={quote(state, safe='')}"
+        if code_challenge is not None:
+            url = f"{url}&code_challenge={code_challenge}&code_challenge_method=S256"
+        return url
+
+    @property
+    def oidc_discovery_url(self) -> Optional[str]:
+        if not self.oidc_issuers:
+            return None
+        return f"{self.oidc_issuers[0]}/.well-known/openid-configuration"
+
+    @property
+    def timeout(self):
+        return self.http_client.timeout_for(self.name)
 
     @abstractmethod
     def get_client_id(self) -> str:
@@ -39,6 +78,20 @@ class OAuthProvider(ABC):
     def generate_auth_header(self) -> Dict[str, str]:
         pass
 
+    def get_user_info_resources(self) -> Dict[str, str]:
+        """Userinfo endpoints to fetch with the access token, by name; fetched concurrently."""
+        return {"profile": self.get_user_info_url()}
+
+    def merge_user_data(self, resources: Dict[str, Any]) -> dict:
+        """Combine the fetched resources into the user data used for sign-in."""
+        return self.process_user_data(resources["profile"])
+
     @abstractmethod
     def process_user_data(self, user_data: dict) -> dict:
         pass
+
+    def process_id_token_claims(self, claims: dict) -> Optional[dict]:
+        """User data from verified ``id_token`` claims, or ``None`` to fall back to userinfo."""
+        if not claims.get("sub") or not claims.get("email"):
+            return None
+        return {"id": claims["sub"], "email": claims["email"], "name": claims.get("name")}
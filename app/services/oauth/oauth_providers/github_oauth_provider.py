@@ -1,12 +1,12 @@
 from app.services.oauth.oauth_base import OAuthProvider
 from app.config import settings
-from fastapi import HTTPException
-from httpx import AsyncClient
 import base64
-from typing import Dict
+from typing import Any, Dict, List, Optional
 
 
 class GitHubOAuthProvider(OAuthProvider):
+    name = "github"
+
     def get_client_id(self) -> str:
         return settings.GITHUB_CLIENT_ID
 
@@ -33,14 +33,15 @@ class GitHubOAuthProvider(OAuthProvider):
         auth_value = base64.b64encode(credentials.encode()).decode()
         return {"Accept": "application/json", "Authorization": f"Basic {auth_value}"}
 
-    async def process_user_data(self, user_data: dict, token: str) -> dict:
-        async with AsyncClient() as client:
-            email_url = "https://api.github.com/user/emails"
-            email_response = await client.get(email_url, headers={"Authorization": f"Bearer {token}"})
-            if email_response.status_code != 200:
-                raise HTTPException(status_code=400, detail="Failed to fetch email data from GitHub")
-            emails = email_response.json()
-            primary_email = next((email for email in emails if email.get("primary")), None)
-            if primary_email:
-                user_data["email"] = primary_email["email"]
+    def get_user_info_resources(self) -> Dict[str, str]:
+        # The profile's email is empty when the user keeps it private.
+        return {"profile": self.get_user_info_url(), "emails": "https://api.github.com/user/emails"}
+
+    def merge_user_data(self, resources: Dict[str, Any]) -> dict:
+        return self.process_user_data(resources["profile"], resources["emails"])
+
+    def process_user_data(self, user_data: dict, emails: Optional[List[dict]] = None) -> dict:
+        primary_email = next((email for email in emails or [] if email.get("primary")), None)
+        if primary_email:
+            user_data["email"] = primary_email["email"]
         return user_data
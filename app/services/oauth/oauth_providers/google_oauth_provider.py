@@ -4,6 +4,11 @@ from typing import Dict
 
 
 class GoogleOAuthProvider(OAuthProvider):
+    name = "google"
+    # Google issues tokens with and without the scheme.
+    oidc_issuers = ("https://accounts.google.com", "accounts.google.com")
+    supports_pkce = True
+
     def get_client_id(self) -> str:
         return settings.GOOGLE_CLIENT_ID
 
@@ -4,6 +4,9 @@ from typing import Dict
 
 
 class LinkedInOAuthProvider(OAuthProvider):
+    name = "linkedin"
+    oidc_issuers = ("https://www.linkedin.com/oauth",)
+
     def get_client_id(self) -> str:
         return settings.LINKEDIN_CLIENT_ID
 
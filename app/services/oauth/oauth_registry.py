@@ -0,0 +1,70 @@
+import importlib
+import logging
+from importlib.metadata import entry_points
+from typing import Dict, Iterable, Optional, Type
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.http_client import SharedHTTPClient
+from app.services.oauth.oauth_base import OAuthProvider
+from app.services.oauth.oauth_providers import GoogleOAuthProvider, GitHubOAuthProvider, LinkedInOAuthProvider
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "fastapi_starter.oauth_providers"
+
+BUILTIN_PROVIDERS = (GoogleOAuthProvider, GitHubOAuthProvider, LinkedInOAuthProvider)
+
+
+def _load_object(path: str):
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class OAuthProviderRegistry:
+    """Holds one instance of every configured OAuth provider, keyed by name.
+
+    Besides the built-in providers, classes are picked up from the
+    ``fastapi_starter.oauth_providers`` entry-point group and from
+    ``OAUTH_PROVIDER_PLUGINS`` (``"package.module:ProviderClass"`` strings).
+    """
+
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None):
+        self.http_client = http_client
+        self._providers: Dict[str, OAuthProvider] = {}
+
+    def register(self, provider_class: Type[OAuthProvider]) -> Type[OAuthProvider]:
+        provider = provider_class(self.http_client)
+        if provider.name in self._providers:
+            logger.warning(f"OAuth provider '{provider.name}' is being replaced by {provider_class.__name__}")
+        self._providers[provider.name] = provider
+        return provider_class
+
+    def register_all(self, provider_classes: Iterable[Type[OAuthProvider]]) -> None:
+        for provider_class in provider_classes:
+            self.register(provider_class)
+
+    def load_plugins(self) -> None:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            logger.info(f"Loading OAuth provider plugin {entry_point.name} from {entry_point.value}")
+            self.register(entry_point.load())
+        for path in settings.OAUTH_PROVIDER_PLUGINS:
+            logger.info(f"Loading OAuth provider plugin {path}")
+            self.register(_load_object(path))
+
+    def get_provider(self, name: str) -> OAuthProvider:
+        try:
+            return self._providers[name]
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unsupported OAuth provider: {name}")
+
+    def names(self):
+        return list(self._providers)
+
+    @classmethod
+    def default(cls, http_client: Optional[SharedHTTPClient] = None) -> "OAuthProviderRegistry":
+        registry = cls(http_client)
+        registry.register_all(BUILTIN_PROVIDERS)
+        registry.load_plugins()
+        return registry
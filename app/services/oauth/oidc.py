@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from jose import JWTError, jwt
+
+from app.config import settings
+from app.core.http_client import SharedHTTPClient, shared_http_client
+from app.core.resilience import resilience_for
+from app.core.tokens import InvalidTokenError
+from app.services.oauth.oauth_base import OAuthProvider
+
+logger = logging.getLogger(__name__)
+
+# Symmetric algorithms would let anyone holding the client secret mint tokens.
+ALLOWED_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "PS256", "PS384", "PS512")
+
+
+@dataclass
+class _CachedDocument:
+    value: dict
+    fetched_at: float
+
+
+class OIDCMetadataCache:
+    """Discovery documents and JWK Sets by URL, cached for ``OAUTH_OIDC_CACHE_TTL``.
+
+    Only the first use of a URL waits on the network. After that a stale
+    document is served while a background task refreshes it, and concurrent
+    callers share one in-flight request. An ``id_token`` signed with an
+    unknown ``kid`` forces one JWKS refresh, at most every
+    ``min_refresh_interval`` seconds, to pick up rotated keys.
+    """
+
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None, ttl: Optional[float] = None, min_refresh_interval: float = 60.0):
+        self.http_client = http_client or shared_http_client
+        self.ttl = settings.OAUTH_OIDC_CACHE_TTL if ttl is None else ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._documents: Dict[str, _CachedDocument] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, url: str, provider: str) -> dict:
+        document = self._documents.get(url)
+        if document is None:
+            return await asyncio.shield(self._refresh(url, provider))
+        if time.monotonic() - document.fetched_at >= self.ttl:
+            self._refresh(url, provider)
+        return document.value
+
+    async def force_refresh(self, url: str, provider: str) -> Optional[dict]:
+        """Refetch ``url`` now unless it was fetched within ``min_refresh_interval``."""
+        document = self._documents.get(url)
+        if document is not None and time.monotonic() - document.fetched_at < self.min_refresh_interval:
+            return None
+        return await asyncio.shield(self._refresh(url, provider))
+
+    def _refresh(self, url: str, provider: str) -> asyncio.Future:
+        task = self._in_flight.get(url)
+        if task is None:
+            task = self._in_flight[url] = asyncio.ensure_future(self._fetch(url, provider))
+            task.add_done_callback(lambda done: self._refresh_done(url, done))
+        return task
+
+    def _refresh_done(self, url: str, task: asyncio.Future) -> None:
+        self._in_flight.pop(url, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to fetch {url}: {task.exception()!r}")
+
+    async def _fetch(self, url: str, provider: str) -> dict:
+        response = await resilience_for(provider).call(
+            lambda: self.http_client.client.get(url, timeout=self.http_client.timeout_for(provider)),
+            idempotent=True,
+        )
+        response.raise_for_status()
+        value = response.json()
+        self._documents[url] = _CachedDocument(value, time.monotonic())
+        return value
+
+    async def verify_id_token(self, provider: OAuthProvider, id_token: str, access_token: Optional[str] = None) -> dict:
+        """Verify ``id_token`` against the provider's published keys and return its claims.
+
+        Checks the signature, ``iss``, ``aud`` (our client id) and expiry, plus
+        ``at_hash`` when the token carries one. Raises ``InvalidTokenError``.
+        """
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+        discovery = await self.get(provider.oidc_discovery_url, provider.name)
+        algorithm = header.get("alg")
+        if algorithm not in ALLOWED_ALGORITHMS or algorithm not in discovery.get("id_token_signing_alg_values_supported", ("RS256",)):
+            raise InvalidTokenError(f"Unexpected id_token algorithm: {algorithm}")
+
+        jwks_uri = discovery["jwks_uri"]
+        key = _find_key(await self.get(jwks_uri, provider.name), header.get("kid"))
+        if key is None:
+            jwks = await self.force_refresh(jwks_uri, provider.name)
+            key = _find_key(jwks, header.get("kid")) if jwks is not None else None
+        if key is None:
+            raise InvalidTokenError("Unknown id_token signing key")
+
+        try:
+            return jwt.decode(
+                id_token,
+                key,
+                algorithms=[algorithm],
+                audience=provider.client_id,
+                issuer=(discovery["issuer"], *provider.oidc_issuers),
+                access_token=access_token,
+            )
+        except JWTError as e:
+            raise InvalidTokenError(str(e))
+
+
+def _find_key(jwks: dict, kid: Optional[str]) -> Optional[dict]:
+    keys = [key for key in jwks.get("keys", []) if key.get("use", "sig") == "sig"]
+    if kid is None:
+        return keys[0] if len(keys) == 1 else None
+    return next((key for key in keys if key.get("kid") == kid), None)
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Tuple, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import metrics, timed
+from app.core.revocation import revocation_index
+from app.models import User
+from app.repositories import RefreshTokenRepository, UserRepository
+
+logger = logging.getLogger(__name__)
+
+refresh_token_reuse_total = metrics.counter(
+    "refresh_token_reuse_total", "Already-used refresh tokens presented again; each revokes its session."
+)
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class InvalidRefreshTokenError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+class RefreshTokenService:
+    """Opaque, rotating refresh tokens grouped into sessions ("families").
+
+    The family id doubles as the ``sid`` claim of the access tokens issued
+    with it, so revoking a family also cuts off those access tokens through
+    the revocation index. Presenting a token that was already rotated means it
+    leaked, and revokes the whole family.
+    """
+
+    @staticmethod
+    def _new_token() -> Tuple[str, str, datetime]:
+        token = secrets.token_urlsafe(32)
+        return token, hash_refresh_token(token), datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    @staticmethod
+    @timed("refresh_token_issue")
+    async def issue(db: Union[Session, AsyncSession], user_id: int) -> Tuple[str, str]:
+        """Start a session for ``user_id``; returns the refresh token and its session id."""
+        token, token_hash, expires_at = RefreshTokenService._new_token()
+        session_id = secrets.token_urlsafe(16)
+        await RefreshTokenRepository(db).add(user_id, session_id, token_hash, expires_at)
+        return token, session_id
+
+    @staticmethod
+    @timed("refresh_token_rotate")
+    async def rotate(db: Union[Session, AsyncSession], token: str) -> Tuple[User, str, str]:
+        """Exchange ``token`` for a new one; returns the user, the new token and the session id.
+
+        Raises ``InvalidRefreshTokenError`` (401) for unknown, expired, revoked
+        or reused tokens and for inactive users.
+        """
+        repository = RefreshTokenRepository(db)
+        token_hash = hash_refresh_token(token)
+        new_token, new_hash, expires_at = RefreshTokenService._new_token()
+        now = datetime.utcnow()
+        claimed = await repository.rotate(token_hash, new_hash, expires_at, now)
+        if claimed is None:
+            existing = await repository.get_by_hash(token_hash)
+            if existing is not None and existing.used_at is not None and existing.revoked_at is None:
+                refresh_token_reuse_total.inc()
+                logger.warning(f"Refresh token reused for user {existing.user_id}, revoking session")
+                await RefreshTokenService.revoke_session(db, existing.family_id)
+            raise InvalidRefreshTokenError()
+        user_id, session_id = claimed
+        user = await UserRepository(db).get_by_id(user_id)
+        if user is None or not user.is_active:
+            await RefreshTokenService.revoke_session(db, session_id)
+            raise InvalidRefreshTokenError()
+        return user, new_token, session_id
+
+    @staticmethod
+    async def revoke(db: Union[Session, AsyncSession], token: str) -> bool:
+        """Revoke the session ``token`` belongs to, e.g. on logout; ``False`` if the token is unknown."""
+        existing = await RefreshTokenRepository(db).get_by_hash(hash_refresh_token(token))
+        if existing is None:
+            return False
+        await RefreshTokenService.revoke_session(db, existing.family_id)
+        return True
+
+    @staticmethod
+    async def revoke_session(db: Union[Session, AsyncSession], session_id: str) -> None:
+        now = datetime.utcnow()
+        await RefreshTokenRepository(db).revoke_family(session_id, now)
+        # Effective here at once; other processes pick it up on their next sync.
+        revocation_index.revoke(session_id, now)
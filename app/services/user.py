@@ -1,91 +1,183 @@
+import asyncio
+import time
+from typing import Union
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from app.models import User, UserOAuth
 from app.schemas import UserCreate
-from app.core.security import SecurityManager
+from app.core.email_index import email_index
+from app.core.hashing import HashingCapacityExceeded, fake_verifier, password_hash_executor
+from app.core.metrics import stage_timer, timed
+from app.core.security import security_manager
+from app.core.user_cache import user_cache
+from app.db import session_scope
+from app.repositories import UserRepository
 import logging
 
 logger = logging.getLogger(__name__)
 
+_background_tasks = set()
+
 class UserService:
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
-        existing_user = db.query(User).filter(User.email == user.email).first()
+    async def create_user_async(db: Union[Session, AsyncSession], user: UserCreate) -> User:
+        repository = UserRepository(db)
+        with stage_timer("db_user_lookup"):
+            existing_user = await repository.get_by_email(user.email)
         if existing_user:
             raise UserAlreadyExistsException(user.email)
 
-        hashed_password = SecurityManager().get_password_hash(user.password)
+        hashed_password = await security_manager.hash_password_async(user.password)
         db_user = User(
             email=user.email,
             full_name=user.full_name,
             hashed_password=hashed_password
         )
 
-        db.add(db_user)
         try:
-            db.commit()
-            db.refresh(db_user)
+            with stage_timer("db_user_insert"):
+                await repository.add(db_user)
         except IntegrityError:
-            db.rollback()
             raise DatabaseErrorException(user.email)
+        email_index.add(db_user.email)
+        await user_cache.invalidate(db_user.email)
 
         return db_user
 
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> User:
-        user = db.query(User).filter(User.email == email).first()
-        if not user or not SecurityManager().verify_password(password, user.hashed_password):
+    async def authenticate_user_async(db: Union[Session, AsyncSession], email: str, password: str) -> User:
+        # Unknown emails fail after about as long as wrong passwords do, but
+        # without the lookup or the hashing when the email index rules them out.
+        # The index may not have caught up with other workers yet, so a miss
+        # is confirmed by a shared catch-up read while the fake check runs.
+        if not email_index.might_contain(email):
+            await asyncio.gather(UserService._fake_verify(password), email_index.refresh())
+            if not email_index.might_contain(email):
+                return None
+        start = time.perf_counter()
+        with stage_timer("db_user_lookup"):
+            user = await UserRepository(db).get_by_email(email)
+        if not user:
+            await UserService._fake_verify(password)
+            return None
+        verified = await security_manager.verify_password_async(password, user.hashed_password)
+        fake_verifier.record(time.perf_counter() - start)
+        if not verified:
             return None
+        if security_manager.needs_rehash(user.hashed_password):
+            UserService._schedule(UserService._rehash_password(user.id, user.hashed_password, password))
         return user
 
     @staticmethod
-    def get_or_create_oauth_user(db: Session, email: str, oauth_provider: str, oauth_user_id: str, full_name: str = None) -> User:
+    async def _fake_verify(password: str) -> None:
+        if not password_hash_executor.has_capacity():
+            raise HashingCapacityExceeded()
+
+        async def verify_against_dummy():
+            await security_manager.verify_password_async(password, await security_manager.unusable_password_hash())
+
+        with stage_timer("password_fake_verify"):
+            await fake_verifier.wait(verify_against_dummy)
+
+    @staticmethod
+    def _schedule(coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    @staticmethod
+    async def _rehash_password(user_id: int, old_hash: str, password: str) -> None:
+        """Upgrade a hash made under an older policy; runs after the login response is sent."""
+        try:
+            new_hash = await security_manager.hash_password_async(password)
+            async with session_scope() as db:
+                if await UserRepository(db).update_password_hash(user_id, old_hash, new_hash):
+                    logger.info(f"Rehashed password for user {user_id} with the current policy")
+        except Exception:
+            logger.exception(f"Failed to rehash password for user {user_id}")
+
+    @staticmethod
+    @timed("db_oauth_user")
+    async def get_or_create_oauth_user_async(
+        db: Union[Session, AsyncSession], email: str, oauth_provider: str, oauth_user_id: str, full_name: str = None
+    ) -> User:
         logger.info(f"Getting or creating OAuth user: email={email}, provider={oauth_provider}, oauth_user_id={oauth_user_id}")
+        repository = UserRepository(db)
+        # Returning logins resolve by provider identity, which survives email
+        # changes at the provider; email is only used to link a first login.
+        if oauth_provider and oauth_user_id:
+            linked_user = await repository.get_by_provider_identity(oauth_provider, oauth_user_id)
+            if linked_user:
+                return linked_user
 
-        user = db.query(User).filter(User.email == email).first()
+        hashed_password = await security_manager.unusable_password_hash()
+
+        if repository.supports_upsert:
+            try:
+                # An existing row keeps its cached fields, so there is nothing to invalidate.
+                user = await repository.upsert_oauth_user(
+                    email, full_name or "OAuth User", hashed_password, oauth_provider, oauth_user_id
+                )
+            except IntegrityError as e:
+                logger.error(f"Failed to upsert OAuth user: {str(e)}")
+                raise HTTPException(status_code=500, detail="Failed to link OAuth provider")
+            email_index.add(user.email)
+            return user
+
+        user = await repository.get_by_email(email)
 
         if not user:
             logger.info(f"Creating new user for email: {email}")
-            hashed_password = SecurityManager().get_password_hash("oauth-placeholder")
-            user = User(
+            user = await repository.add(User(
                 email=email,
                 full_name=full_name or "OAuth User",
                 hashed_password=hashed_password
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+            ))
             logger.info(f"New user created: {user.id}")
+            email_index.add(email)
+            await user_cache.invalidate(email)
 
-        user_oauth = UserService._get_user_oauth(db, user.id, oauth_provider)
+        if not (oauth_provider and oauth_user_id):
+            return user
+
+        user_oauth = await repository.get_user_oauth(user.id, oauth_provider)
 
         if not user_oauth:
             logger.info(f"Linking new OAuth provider {oauth_provider} to user {user.id}")
-            user_oauth = UserOAuth(
-                user_id=user.id,
-                oauth_provider=oauth_provider,
-                oauth_user_id=oauth_user_id
-            )
-            db.add(user_oauth)
             try:
-                db.commit()
-                db.refresh(user_oauth)
+                await repository.add(UserOAuth(
+                    user_id=user.id,
+                    oauth_provider=oauth_provider,
+                    oauth_user_id=oauth_user_id
+                ))
                 logger.info(f"OAuth provider {oauth_provider} linked to user {user.id}")
             except IntegrityError as e:
                 logger.error(f"Failed to link OAuth provider: {str(e)}")
-                db.rollback()
                 raise HTTPException(status_code=500, detail="Failed to link OAuth provider")
+        elif user_oauth.oauth_user_id != oauth_user_id:
+            logger.warning(
+                f"User {user.id} is already linked to another {oauth_provider} account; "
+                f"{oauth_provider} user {oauth_user_id} was not linked"
+            )
         else:
             logger.info(f"OAuth provider {oauth_provider} already linked to user {user.id}")
 
         return user
 
     @staticmethod
-    def _get_user_oauth(db: Session, user_id: int, oauth_provider: str) -> UserOAuth:
-        return db.query(UserOAuth).filter(
-            UserOAuth.user_id == user_id, UserOAuth.oauth_provider == oauth_provider
-        ).first()
+    async def set_active_async(db: Union[Session, AsyncSession], email: str, is_active: bool) -> User:
+        repository = UserRepository(db)
+        user = await repository.get_by_email(email)
+        if not user:
+            raise HTTPException(status_code=404, detail=f"User with email '{email}' not found.")
+        user.is_active = is_active
+        await repository.add(user)
+        await user_cache.invalidate(email)
+        if not is_active:
+            security_manager.invalidate_user_tokens(email)
+        return user
 
 class UserAlreadyExistsException(HTTPException):
     def __init__(self, email: str):
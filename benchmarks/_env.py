@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+
+def configure_environment(**overrides) -> str:
+    """Point the app at a throwaway SQLite database before ``app`` is imported."""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="auth-bench-"), "bench.db")
+    defaults = {
+        "SECRET_KEY": "benchmark-secret",
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "GOOGLE_CLIENT_ID": "bench",
+        "GOOGLE_CLIENT_SECRET": "bench",
+        "GOOGLE_REDIRECT_URI": "http://127.0.0.1:8000/auth/google/callback",
+        "GITHUB_CLIENT_ID": "bench",
+        "GITHUB_CLIENT_SECRET": "bench",
+        "GITHUB_REDIRECT_URI": "http://127.0.0.1:8000/auth/github/callback",
+        "LINKEDIN_CLIENT_ID": "bench",
+        "LINKEDIN_CLIENT_SECRET": "bench",
+        "LINKEDIN_REDIRECT_URI": "http://127.0.0.1:8000/auth/linkedin/callback",
+    }
+    defaults.update({key: str(value) for key, value in overrides.items()})
+    for key, value in defaults.items():
+        os.environ[key] = value
+    return db_path
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def quiet_logging() -> None:
+    """Drop the app's per-request logs so they do not skew timings."""
+    import logging
+
+    logging.disable(logging.WARNING)
@@ -0,0 +1,221 @@
+"""Throughput, latency percentiles and DB queries per request for the auth endpoints.
+
+    python -m benchmarks.auth_load --target asgi --concurrency 32 --output results.json
+    python -m benchmarks.auth_load --target uvicorn --baseline results.json --threshold 0.2
+
+``asgi`` drives the app in-process through ``httpx.ASGITransport``; ``uvicorn``
+serves it on a local port so connection handling and serialization are part
+of the timings. OAuth callbacks talk to a local server running the fake
+provider from ``tests.fake_provider``. With ``--baseline`` the run fails
+(exit code 1) when a scenario's throughput drops, or its p95 latency grows,
+by more than ``--threshold`` relative to the baseline results.
+
+``--provider-latency`` and ``--provider-error-rate`` make the fake provider
+slow or flaky, e.g. to compare tail latency with and without ``--hedge-delay``.
+
+Every request comes from one client address, so the login rate limiter is
+off unless ``--login-rate-limit`` is given; with it, ``login_failed`` shows
+the cost of throttled password spraying (429s) against unthrottled failures.
+``login_unknown`` is credential stuffing with unregistered emails; compare its
+``cpu_ms_per_request`` (process CPU time, client included for ``asgi``) and
+latency with ``login_failed``, and with ``EMAIL_INDEX_ENABLED=false``.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+
+from benchmarks._env import configure_environment, percentile, quiet_logging
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+SCENARIOS = ("register", "login", "login_failed", "login_unknown", "oauth_url", "oauth_callback")
+
+
+class QueryCounter:
+    def __init__(self, *engines):
+        from sqlalchemy import event
+
+        self.queries = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_query)
+
+    def _on_query(self, *args):
+        self.queries += 1
+
+
+def _request(scenario: str, provider: str, worker: int, n: int, users: int):
+    if scenario == "register":
+        email = f"load-{worker}-{n}-{time.monotonic_ns()}@example.com"
+        return "POST", "/auth/register", {"json": {"email": email, "password": PASSWORD}}
+    if scenario == "login":
+        return "POST", "/auth/login", {"json": {"email": EMAIL, "password": PASSWORD}}
+    if scenario == "login_failed":
+        return "POST", "/auth/login", {"json": {"email": EMAIL, "password": f"wrong-{worker}-{n}"}}
+    if scenario == "login_unknown":
+        return "POST", "/auth/login", {"json": {"email": f"unknown-{worker}-{n}@example.com", "password": PASSWORD}}
+    if scenario == "oauth_url":
+        return "GET", f"/auth/{provider}/url", {}
+    from app.core.oauth_state import BINDING_COOKIE, oauth_state
+
+    # A bounded pool of codes mixes first logins with returning ones; each
+    # callback needs a fresh state, as if it followed its own /url request.
+    binding = f"load-{worker}"
+    state, _ = oauth_state.issue(provider, binding)
+    return "GET", f"/auth/{provider}/callback", {
+        "params": {"code": f"user-{(worker * 7919 + n) % users}", "state": state},
+        "headers": {"Cookie": f"{BINDING_COOKIE}={binding}"},
+    }
+
+
+async def _worker(client, scenario, provider, worker, deadline, users, latencies, statuses) -> None:
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        method, url, kwargs = _request(scenario, provider, worker, n, users)
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run_scenario(client, counter, scenario, provider, concurrency, duration, users) -> dict:
+    latencies: list = []
+    statuses: dict = {}
+    queries_before = counter.queries
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(client, scenario, provider, worker, deadline, users, latencies, statuses)
+        for worker in range(concurrency)
+    ))
+    # Requests in flight at the deadline still complete, so divide by wall time.
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_before
+    requests = len(latencies)
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "db_queries_per_request": round((counter.queries - queries_before) / max(requests, 1), 2),
+        "cpu_ms_per_request": round(cpu * 1000 / max(requests, 1), 2),
+        "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def find_regressions(results: list, baseline: list, threshold: float) -> list:
+    """Scenarios whose throughput fell or p95 rose by more than ``threshold`` (a fraction)."""
+    previous = {(result["target"], result["scenario"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["target"], result["scenario"]))
+        if before is None:
+            continue
+        if result["requests_per_second"] < before["requests_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{result['scenario']}: {result['requests_per_second']} req/s vs {before['requests_per_second']} in baseline"
+            )
+        if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{result['scenario']}: p95 {result['p95_ms']} ms vs {before['p95_ms']} ms in baseline")
+    return regressions
+
+
+async def run(app, args, counter) -> list:
+    import httpx
+
+    from app.core.http_client import shared_http_client
+    from benchmarks.fake_provider import BackgroundServer, ProviderRedirectTransport
+    from tests.fake_provider import fake_provider_app, faults
+
+    faults.latency = args.provider_latency
+    faults.error_rate = args.provider_error_rate
+    with contextlib.ExitStack() as stack:
+        provider = stack.enter_context(BackgroundServer(fake_provider_app))
+        shared_http_client.transport = ProviderRedirectTransport(provider.url)
+        if args.target == "uvicorn":
+            server = stack.enter_context(BackgroundServer(app))
+            client_kwargs = {"base_url": server.url}
+        else:
+            # Lifespan does not run under ASGITransport.
+            from app.core.email_index import email_index
+
+            shared_http_client.start()
+            await email_index.rebuild()
+            client_kwargs = {"transport": httpx.ASGITransport(app=app), "base_url": "http://bench"}
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        results = []
+        async with httpx.AsyncClient(limits=limits, timeout=60, **client_kwargs) as client:
+            for scenario in args.scenarios:
+                result = await run_scenario(
+                    client, counter, scenario, args.provider, args.concurrency, args.duration, args.users
+                )
+                result.update(target=args.target, concurrency=args.concurrency)
+                results.append(result)
+        if args.target == "asgi":
+            await shared_http_client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--provider", default="github", help="provider used by the oauth scenarios")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument("--users", type=int, default=100, help="distinct OAuth identities in the callback scenario")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="seconds added to each fake provider response")
+    parser.add_argument("--provider-error-rate", type=float, default=0.0, help="share of fake provider requests that fail with 503")
+    parser.add_argument("--hedge-delay", type=float, default=0.0, help="OAUTH_HEDGE_DELAY for the run; 0 disables hedging")
+    parser.add_argument("--login-rate-limit", action="store_true", help="keep the login rate limiter enabled")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    configure_environment(
+        DB_MODE=args.db_mode, OAUTH_HEDGE_DELAY=args.hedge_delay, LOGIN_RATE_LIMIT_ENABLED=args.login_rate_limit
+    )
+    from app.core.hashing import password_hash_executor
+    from app.db import SessionLocal, async_engine, engine, init_db
+    from app.main import app
+    from app.schemas import UserCreate
+    from app.services.user import UserService
+
+    quiet_logging()
+    init_db()
+    db = SessionLocal()
+    try:
+        asyncio.run(UserService.create_user_async(db, UserCreate(email=EMAIL, password=PASSWORD)))
+    finally:
+        db.close()
+
+    counter = QueryCounter(engine, *([async_engine.sync_engine] if async_engine is not None else []))
+    try:
+        results = asyncio.run(run(app, args, counter))
+    finally:
+        password_hash_executor.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
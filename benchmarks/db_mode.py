@@ -0,0 +1,90 @@
+"""Throughput of database-bound auth requests in sync vs async DB_MODE.
+
+    python -m benchmarks.db_mode --db-mode sync
+    python -m benchmarks.db_mode --db-mode async
+
+The default ``unknown-login`` scenario posts logins for emails that do not
+exist, so each request is one users lookup and no bcrypt work.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import configure_environment, percentile, quiet_logging
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+
+
+async def _worker(client, scenario: str, deadline: float, latencies: list, statuses: dict) -> None:
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        email = EMAIL if scenario == "login" else f"missing-{n}@example.com"
+        start = time.perf_counter()
+        response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run(app, scenario: str, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies: list = []
+    statuses: dict = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            _worker(client, scenario, deadline, latencies, statuses) for _ in range(concurrency)
+        ))
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "status_counts": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--scenario", choices=["unknown-login", "login"], default="unknown-login")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    configure_environment(DB_MODE=args.db_mode)
+    from app.core.hashing import password_hash_executor
+    from app.db import SessionLocal, async_engine, init_db
+    from app.main import app
+    from app.schemas import UserCreate
+    from app.services.user import UserService
+
+    quiet_logging()
+    init_db()
+    db = SessionLocal()
+    try:
+        asyncio.run(UserService.create_user_async(db, UserCreate(email=EMAIL, password=PASSWORD)))
+    finally:
+        db.close()
+
+    async def _run():
+        try:
+            return await run(app, args.scenario, args.concurrency, args.duration)
+        finally:
+            if async_engine is not None:
+                await async_engine.dispose()
+
+    try:
+        result = asyncio.run(_run())
+    finally:
+        password_hash_executor.shutdown()
+    result.update(db_mode=args.db_mode, scenario=args.scenario, concurrency=args.concurrency)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
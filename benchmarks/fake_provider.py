@@ -0,0 +1,72 @@
+"""HTTP plumbing for load runs against the fake OAuth provider in ``tests.fake_provider``.
+
+``BackgroundServer`` serves it on a local port, and ``ProviderRedirectTransport``
+sends the app's outbound provider calls there instead of the real hosts.
+"""
+import socket
+import threading
+import time
+
+import httpx
+
+PROVIDER_HOSTS = (
+    "accounts.google.com",
+    "github.com",
+    "api.github.com",
+    "oauth2.googleapis.com",
+    "www.googleapis.com",
+    "www.linkedin.com",
+    "api.linkedin.com",
+)
+
+
+class ProviderRedirectTransport(httpx.AsyncHTTPTransport):
+    """Rewrites requests for the real provider hosts to ``base_url``."""
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = httpx.URL(base_url)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host in PROVIDER_HOSTS:
+            request.url = request.url.copy_with(
+                scheme=self.base_url.scheme, host=self.base_url.host, port=self.base_url.port
+            )
+            request.headers["Host"] = self.base_url.netloc.decode()
+        return await super().handle_async_request(request)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app under uvicorn on a daemon thread."""
+
+    def __init__(self, app, port: int = 0, **config):
+        import uvicorn
+
+        self.port = port or free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", **config)
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
@@ -0,0 +1,94 @@
+"""Latency of an unrelated endpoint while concurrent logins run bcrypt.
+
+Compare running bcrypt on the event loop against the hashing executor:
+
+    python -m benchmarks.login_latency --executor inline
+    python -m benchmarks.login_latency --executor thread
+    python -m benchmarks.login_latency --executor process
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import configure_environment, percentile, quiet_logging
+
+EMAIL = "bench@example.com"
+PASSWORD = "benchmark-password"
+
+
+async def _login_worker(client, deadline: float, stats: dict) -> None:
+    while time.perf_counter() < deadline:
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        stats[response.status_code] = stats.get(response.status_code, 0) + 1
+
+
+async def _probe(client, deadline: float, interval: float) -> list:
+    samples = []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/auth/google/url")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def run(app, logins: int, duration: float, interval: float) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + duration
+        login_stats: dict = {}
+        workers = [_login_worker(client, deadline, login_stats) for _ in range(logins)]
+        results = await asyncio.gather(_probe(client, deadline, interval), *workers)
+    samples = results[0]
+    return {
+        "probe_requests": len(samples),
+        "probe_p50_ms": round(percentile(samples, 50), 2),
+        "probe_p99_ms": round(percentile(samples, 99), 2),
+        "probe_max_ms": round(max(samples, default=0.0), 2),
+        "login_status_counts": login_stats,
+        "logins_per_second": round(login_stats.get(200, 0) / duration, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--executor", choices=["inline", "thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=0, help="hashing pool size (0 = CPU count)")
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login loops")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between probe requests")
+    args = parser.parse_args()
+
+    configure_environment(
+        HASH_EXECUTOR=args.executor,
+        HASH_MAX_WORKERS=args.workers,
+        HASH_MAX_PENDING=args.max_pending,
+    )
+    from app.core.hashing import password_hash_executor
+    from app.db import SessionLocal, init_db
+    from app.main import app
+    from app.schemas import UserCreate
+    from app.services.user import UserService
+
+    quiet_logging()
+    init_db()
+    db = SessionLocal()
+    try:
+        asyncio.run(UserService.create_user_async(db, UserCreate(email=EMAIL, password=PASSWORD)))
+    finally:
+        db.close()
+
+    try:
+        result = asyncio.run(run(app, args.logins, args.duration, args.interval))
+    finally:
+        password_hash_executor.shutdown()
+    result["executor"] = args.executor
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Statements, commits and latency per OAuth user resolution: select/insert vs upsert.
+
+    python -m benchmarks.oauth_upsert --iterations 200
+
+Both paths go through ``UserService.get_or_create_oauth_user_async``.
+``select_insert`` is the sequence it falls back to on dialects without
+``ON CONFLICT``: look up the email, insert the user, then look up and insert
+the link, committing each insert. ``upsert`` is the dialect-aware path the
+OAuth callback takes on SQLite and PostgreSQL. Both run against the same
+SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import time
+from unittest import mock
+
+from benchmarks._env import configure_environment, percentile, quiet_logging
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_statement)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+
+def measure(label, iterations, counter, call) -> dict:
+    latencies = []
+    counter.reset()
+    for i in range(iterations):
+        start = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "path": label,
+        "statements_per_call": round(counter.statements / iterations, 2),
+        "commits_per_call": round(counter.commits / iterations, 2),
+        "mean_ms": round(sum(latencies) / iterations, 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    configure_environment()
+    from app.db import SessionLocal, engine, init_db
+    from app.repositories import UserRepository
+    from app.services.user import UserService
+
+    quiet_logging()
+    init_db()
+    counter = StatementCounter(engine)
+    loop = asyncio.new_event_loop()
+    db = SessionLocal()
+
+    def resolve(email_prefix, upsert):
+        def call(i):
+            with mock.patch.object(UserRepository, "supports_upsert", upsert):
+                return loop.run_until_complete(UserService.get_or_create_oauth_user_async(
+                    db, f"{email_prefix}{i}@example.com", "github", f"{email_prefix}{i}", "Bench"
+                ))
+        return call
+
+    # Warm the per-process placeholder hash so bcrypt is not part of the timings.
+    loop.run_until_complete(UserService.get_or_create_oauth_user_async(db, "warmup@example.com", "github", "0"))
+
+    try:
+        results = []
+        # The second pass resolves the accounts created by the first one.
+        for scenario in ("first_login", "returning_login"):
+            for label, upsert in (("select_insert", False), ("upsert", True)):
+                result = measure(label, args.iterations, counter, resolve(f"{label}-", upsert))
+                result["scenario"] = scenario
+                results.append(result)
+    finally:
+        db.close()
+        loop.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Cost of turning a login result into a response body, per response.
+
+    python -m benchmarks.serialization --iterations 50000
+
+``model_path`` is the former path: build a ``Token``, then let FastAPI
+validate it against ``response_model=LoginResponse`` and dump it to JSON.
+``fast_response`` renders the dict directly, as ``create_token_response``
+does now; ``fast_response_stdlib_json`` is the same without orjson.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks._env import configure_environment
+
+
+def _per_call_us(iterations: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - start) / iterations * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    configure_environment()
+    from fastapi import Response
+    from fastapi.routing import APIRoute, serialize_response
+
+    from app.core import responses
+    from app.core.responses import FastJSONResponse
+    from app.schemas import LoginResponse, Token
+
+    access_token = "header.payload.signature-" + "x" * 180
+    refresh_token = "r" * 43
+    field = APIRoute("/login", lambda: None, response_model=LoginResponse).response_field
+    loop = asyncio.new_event_loop()
+
+    def model_path():
+        token = Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+        body = loop.run_until_complete(serialize_response(field=field, response_content=token, dump_json=True))
+        return Response(content=body, media_type="application/json")
+
+    def fast_response():
+        return FastJSONResponse({"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token})
+
+    # run_until_complete has a fixed cost of its own; measure it to subtract it.
+    async def noop():
+        return None
+
+    loop_overhead = _per_call_us(args.iterations, lambda: loop.run_until_complete(noop()))
+    results = {
+        "model_path_us": round(_per_call_us(args.iterations, model_path) - loop_overhead, 2),
+        "fast_response_us": _per_call_us(args.iterations, fast_response),
+    }
+    orjson, responses.orjson = responses.orjson, None
+    results["fast_response_stdlib_json_us"] = _per_call_us(args.iterations, fast_response)
+    responses.orjson = orjson
+    results["orjson_installed"] = orjson is not None
+    loop.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
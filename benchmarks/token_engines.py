@@ -0,0 +1,67 @@
+"""Access tokens issued and verified per second for each JWT backend and algorithm.
+
+    python -m benchmarks.token_engines --iterations 20000
+
+Backends whose library is not installed are reported as skipped.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._env import configure_environment
+
+
+def _keys():
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+    from app.core.tokens import SigningKey
+
+    secret = "benchmark-secret-0123456789abcdefghij"
+    es256 = ec.generate_private_key(ec.SECP256R1())
+    eddsa = ed25519.Ed25519PrivateKey.generate()
+    return {
+        "HS256": SigningKey("bench", "HS256", secret, secret),
+        "ES256": SigningKey("bench", "ES256", es256, es256.public_key()),
+        "EdDSA": SigningKey("bench", "EdDSA", eddsa, eddsa.public_key()),
+    }
+
+
+def _rate(iterations: int, fn) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round(iterations / (time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    configure_environment()
+    from app.core.tokens import BACKENDS, TokenEngine
+
+    claims = {"sub": "bench@example.com", "exp": datetime.utcnow() + timedelta(minutes=30)}
+    results = []
+    for algorithm, key in _keys().items():
+        for name, backend_class in BACKENDS.items():
+            if algorithm not in backend_class.algorithms:
+                continue
+            try:
+                engine = TokenEngine(backend_class(), [key], key.kid)
+            except ImportError as e:
+                results.append({"backend": name, "algorithm": algorithm, "skipped": str(e)})
+                continue
+            token = engine.issue(claims)
+            results.append({
+                "backend": name,
+                "algorithm": algorithm,
+                "issued_per_second": _rate(args.iterations, lambda: engine.issue(claims)),
+                "verified_per_second": _rate(args.iterations, lambda: engine.verify(token)),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
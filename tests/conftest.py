@@ -1,15 +1,27 @@
 # tests/conftest.py
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.db import Base
+from app.db import Base, create_db_engine, get_db, get_read_db, get_sync_db, get_sync_read_db
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Route requests made through TestClient to the same in-memory database the fixtures use.
+for dependency in {get_db, get_read_db, get_sync_db, get_sync_read_db}:
+    app.dependency_overrides[dependency] = override_get_db
 
 client = TestClient(app)
 
@@ -22,7 +34,33 @@ def db():
     finally:
         db.close()
 
+@pytest_asyncio.fixture
+async def async_engine():
+    # A fresh in-memory database per test, for code that runs on an AsyncSession.
+    async_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield async_engine
+    finally:
+        await async_engine.dispose()
+
+@pytest.fixture
+def async_sessions(async_engine):
+    return async_sessionmaker(async_engine, expire_on_commit=False)
+
+@pytest_asyncio.fixture
+async def async_db(async_sessions):
+    async with async_sessions() as session:
+        yield session
+
 @pytest.fixture(autouse=True)
 def clear_db(db):
     from tests.utils import clear_db
     clear_db(db)
+
+@pytest.fixture(autouse=True)
+def fresh_login_rate_limiter(monkeypatch):
+    # Every TestClient request comes from the same address, so counts would leak between tests.
+    from app.core.rate_limit import InMemoryRateLimitBackend, login_rate_limiter
+    monkeypatch.setattr(login_rate_limiter, "backend", InMemoryRateLimitBackend())
@@ -0,0 +1,161 @@
+"""Local stand-in for the Google, GitHub and LinkedIn OAuth endpoints.
+
+The token endpoints echo the authorization code back as the access token and
+the user-info endpoints derive the profile from it, so ``code=user-7`` always
+resolves to ``user-7@example.com``. The Google and LinkedIn token endpoints
+also return an RS256 ``id_token`` whose key is published through OIDC
+discovery and a JWKS. ``faults`` injects latency and errors to exercise
+retries, hedging and the circuit breaker. Tests mount the app through
+``httpx.ASGITransport``; ``benchmarks.fake_provider`` serves it over HTTP.
+"""
+import asyncio
+import random
+import time
+import zlib
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse
+
+class FaultInjector:
+    """Latency and failures applied to requests whose path starts with one of ``paths``.
+
+    ``latency`` delays every matching request and ``error_rate`` fails a random
+    share of them; ``slow_next`` and ``fail_next`` instead delay (by
+    ``slow_latency``) or fail just that many upcoming requests.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.paths = ("/",)
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.error_status = 503
+        self.slow_next = 0
+        self.slow_latency = 1.0
+        self.fail_next = 0
+        self.requests = 0
+
+    async def apply(self, path: str):
+        """An error response to send instead of the real one, or ``None``."""
+        if not path.startswith(self.paths):
+            return None
+        self.requests += 1
+        delay = self.latency
+        if self.slow_next > 0:
+            self.slow_next -= 1
+            delay += self.slow_latency
+        if delay:
+            await asyncio.sleep(delay)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return JSONResponse({"error": "injected"}, status_code=self.error_status)
+        if self.error_rate and random.random() < self.error_rate:
+            return JSONResponse({"error": "injected"}, status_code=self.error_status)
+        return None
+
+
+faults = FaultInjector()
+fake_provider_app = FastAPI()
+
+
+@fake_provider_app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    return await faults.apply(request.url.path) or await call_next(request)
+
+
+def _user(authorization: str) -> str:
+    return authorization.removeprefix("Bearer ")
+
+
+OIDC_ISSUERS = {
+    "/token": "https://accounts.google.com",
+    "/oauth/v2/accessToken": "https://www.linkedin.com/oauth",
+}
+JWKS_URIS = {
+    "https://accounts.google.com": "https://www.googleapis.com/oauth2/v3/certs",
+    "https://www.linkedin.com/oauth": "https://www.linkedin.com/oauth/openid/jwks",
+}
+SIGNING_KID = "fake-provider-1"
+
+
+@lru_cache(maxsize=1)
+def signing_key() -> str:
+    """RSA private key (PEM) used to sign id_tokens, generated once per process."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+def id_token(issuer: str, audience: str, user: str) -> str:
+    from jose import jwt
+
+    now = int(time.time())
+    claims = {
+        "iss": issuer, "aud": audience, "sub": user, "email": f"{user}@example.com", "email_verified": True,
+        "name": user.title(), "iat": now, "exp": now + 3600,
+    }
+    return jwt.encode(claims, signing_key(), algorithm="RS256", headers={"kid": SIGNING_KID})
+
+
+@fake_provider_app.post("/login/oauth/access_token")
+@fake_provider_app.post("/token")
+@fake_provider_app.post("/oauth/v2/accessToken")
+async def token(request: Request):
+    form = parse_qs((await request.body()).decode(), keep_blank_values=True)
+    code = form["code"][0]
+    response = {"access_token": code, "token_type": "bearer", "expires_in": 3600}
+    issuer = OIDC_ISSUERS.get(request.url.path)
+    if issuer is not None:
+        response["id_token"] = id_token(issuer, form["client_id"][0], code)
+    return response
+
+
+@fake_provider_app.get("/.well-known/openid-configuration")
+@fake_provider_app.get("/oauth/.well-known/openid-configuration")
+async def openid_configuration(request: Request):
+    issuer = "https://www.linkedin.com/oauth" if request.url.path.startswith("/oauth/") else "https://accounts.google.com"
+    return {"issuer": issuer, "jwks_uri": JWKS_URIS[issuer], "id_token_signing_alg_values_supported": ["RS256"]}
+
+
+@fake_provider_app.get("/oauth2/v3/certs")
+@fake_provider_app.get("/oauth/openid/jwks")
+async def jwks():
+    from jose import jwk
+
+    public_key = jwk.construct(signing_key(), "RS256").public_key().to_dict()
+    return {"keys": [{**public_key, "kid": SIGNING_KID, "use": "sig"}]}
+
+
+@fake_provider_app.get("/user")
+async def github_user(authorization: str = Header(...)):
+    user = _user(authorization)
+    return {"id": zlib.crc32(user.encode()), "login": user, "name": user.title(), "email": None}
+
+
+@fake_provider_app.get("/user/emails")
+async def github_emails(authorization: str = Header(...)):
+    user = _user(authorization)
+    return [
+        {"email": f"{user}@users.noreply.github.com", "primary": False, "verified": True},
+        {"email": f"{user}@example.com", "primary": True, "verified": True},
+    ]
+
+
+@fake_provider_app.get("/oauth2/v2/userinfo")
+async def google_userinfo(authorization: str = Header(...)):
+    user = _user(authorization)
+    return {"id": user, "email": f"{user}@example.com", "name": user.title()}
+
+
+@fake_provider_app.get("/v2/userinfo")
+async def linkedin_userinfo(authorization: str = Header(...)):
+    user = _user(authorization)
+    return {"sub": user, "email": f"{user}@example.com", "name": user.title()}
@@ -0,0 +1,93 @@
+# tests/test_admin.py
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.core.security import security_manager
+from app.main import app
+from app.models import User, UserOAuth
+from tests.conftest import engine
+from tests.utils import create_test_user, explained_queries, full_scans, TEST_USER_EMAIL
+
+client = TestClient(app)
+
+ADMIN_EMAIL = "admin@example.com"
+
+
+@pytest.fixture
+def admin_headers(db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", [ADMIN_EMAIL])
+    create_test_user(db, email=ADMIN_EMAIL)
+    return {"Authorization": f"Bearer {security_manager.create_access_token({'sub': ADMIN_EMAIL})}"}
+
+
+def _add_users(db, count):
+    users = [User(email=f"user-{i:03d}@example.com", hashed_password="x", full_name=f"User {i}") for i in range(count)]
+    db.add_all(users)
+    db.flush()
+    for user in users[::2]:
+        db.add(UserOAuth(user_id=user.id, oauth_provider="github", oauth_user_id=str(user.id)))
+        db.add(UserOAuth(user_id=user.id, oauth_provider="google", oauth_user_id=str(user.id)))
+    db.commit()
+
+
+def test_admin_endpoints_require_an_admin(db, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_EMAILS", [ADMIN_EMAIL])
+    create_test_user(db)
+    assert client.get("/admin/users").status_code == 401
+    token = security_manager.create_access_token({"sub": TEST_USER_EMAIL})
+    assert client.get("/admin/users", headers={"Authorization": f"Bearer {token}"}).status_code == 403
+
+
+def test_list_users_pages_by_keyset_in_one_query_without_scans(db, admin_headers):
+    from app.core.query_trace import trace_queries
+
+    _add_users(db, 7)
+    # Resolve the admin once, so the traces below only see the listing queries.
+    assert client.get("/admin/users", params={"limit": 1}, headers=admin_headers).status_code == 200
+    seen, cursor = [], None
+    with explained_queries(engine) as plans:
+        while True:
+            with trace_queries(engine) as trace:
+                response = client.get("/admin/users", params={"limit": 3, **({"cursor": cursor} if cursor else {})}, headers=admin_headers)
+            assert response.status_code == 200
+            assert trace.count == 1, f"Users and providers should load in one query, ran: {[q.statement for q in trace.queries]}"
+            page = response.json()
+            seen += page["items"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    assert [user["email"] for user in seen] == [ADMIN_EMAIL] + [f"user-{i:03d}@example.com" for i in range(7)]
+    assert seen[1]["oauth_providers"] == ["github", "google"] and seen[2]["oauth_providers"] == []
+    assert not full_scans(plans), f"Listing should not scan whole tables: {plans}"
+
+
+def test_email_prefix_search_uses_the_email_index(db, admin_headers):
+    _add_users(db, 12)
+    with explained_queries(engine) as plans:
+        first = client.get("/admin/users", params={"email_prefix": "user-01", "limit": 2}, headers=admin_headers).json()
+        second = client.get(
+            "/admin/users", params={"email_prefix": "user-01", "limit": 2, "cursor": first["next_cursor"]}, headers=admin_headers
+        ).json()
+
+    assert [user["email"] for user in first["items"] + second["items"]] == ["user-010@example.com", "user-011@example.com"]
+    assert second["next_cursor"] is None
+    assert not full_scans(plans), f"Prefix search should not scan whole tables: {plans}"
+    assert any("ix_users_email" in line for _, plan in plans for line in plan)
+    assert client.get("/admin/users", params={"cursor": "!!"}, headers=admin_headers).status_code == 400
+
+
+def test_export_streams_all_users_as_ndjson(db, admin_headers, monkeypatch):
+    import json
+    from app.api import admin
+    from tests.utils import testing_session_scope
+
+    monkeypatch.setattr(admin, "session_scope", testing_session_scope)
+    monkeypatch.setattr(admin, "EXPORT_PAGE_SIZE", 2)
+    _add_users(db, 4)
+    response = client.get("/admin/users/export", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["email"] for row in rows] == [ADMIN_EMAIL] + [f"user-{i:03d}@example.com" for i in range(4)]
+    assert rows[1]["oauth_providers"] == ["github", "google"]
@@ -2,6 +2,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.repositories import UserRepository
 from app.services.user import UserService
 from app.schemas import UserCreate
 from tests.utils import create_test_user, TEST_USER_EMAIL, TEST_USER_PASSWORD, TEST_USER_FULL_NAME
@@ -44,20 +45,466 @@ def test_register_existing_user(db):
     assert response.json() == {"detail": f"A user with email '{TEST_USER_EMAIL}' already exists."}, \
         "Response should indicate duplicate email"
 
-def test_create_user(db):
+@pytest.mark.asyncio
+async def test_create_user(db):
     user_in = UserCreate(email=TEST_USER_EMAIL, password=TEST_USER_PASSWORD, full_name=TEST_USER_FULL_NAME)
-    user = UserService.create_user(db=db, user=user_in)
+    user = await UserService.create_user_async(db, user_in)
     assert user.email == TEST_USER_EMAIL, "User email should match the provided email"
 
+def test_login_query_budget(db):
+    from app.core.query_trace import trace_queries
+    from tests.conftest import engine
+
+    create_test_user(db)
+    with trace_queries(engine) as trace:
+        response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD})
+    assert response.status_code == 200
+    assert trace.count <= 2, f"Login should be a user lookup and a refresh token insert, ran: {[q.statement for q in trace.queries]}"
+
 @pytest.mark.parametrize("email, password, expected_result", [
     (TEST_USER_EMAIL, TEST_USER_PASSWORD, True),      
     (TEST_USER_EMAIL, "wrongpassword", False),        
     ("nonexistent@example.com", TEST_USER_PASSWORD, False),  
 ])
-def test_authenticate_user(db, email, password, expected_result):
+@pytest.mark.asyncio
+async def test_authenticate_user(db, email, password, expected_result):
     create_test_user(db)
-    authenticated_user = UserService.authenticate_user(db=db, email=email, password=password)
+    authenticated_user = await UserService.authenticate_user_async(db, email, password)
     assert (authenticated_user is not None) == expected_result, \
         f"Expected authentication result for {email} with password {password} to be {expected_result}"
     if authenticated_user:
         assert authenticated_user.email == TEST_USER_EMAIL, "Authenticated user's email should match"
+
+@pytest.mark.asyncio
+async def test_async_session_user_flow(async_db):
+    user_in = UserCreate(email=TEST_USER_EMAIL, password=TEST_USER_PASSWORD, full_name=TEST_USER_FULL_NAME)
+    created = await UserService.create_user_async(async_db, user_in)
+    assert created.id is not None, "User should be persisted through the AsyncSession"
+
+    authenticated = await UserService.authenticate_user_async(async_db, TEST_USER_EMAIL, TEST_USER_PASSWORD)
+    assert authenticated is not None and authenticated.email == TEST_USER_EMAIL
+
+    oauth_user = await UserService.get_or_create_oauth_user_async(async_db, TEST_USER_EMAIL, "github", "42")
+    assert oauth_user.id == created.id, "OAuth login should link to the existing account"
+
+@pytest.mark.asyncio
+async def test_oauth_login_resolves_by_provider_identity(async_engine, async_db):
+    from sqlalchemy import event, func, select
+    from app.models import User, UserOAuth
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    first = await UserService.get_or_create_oauth_user_async(async_db, "octo@example.com", "github", "42", "Octo")
+    assert len(statements) == 3, "First OAuth login should be an identity lookup, a user upsert and a link insert"
+
+    statements.clear()
+    second = await UserService.get_or_create_oauth_user_async(async_db, "octo@example.com", "github", "42", "Octo")
+    assert first.id == second.id
+    assert len(statements) == 1, "Returning OAuth login should be one indexed read"
+
+    renamed = await UserService.get_or_create_oauth_user_async(async_db, "new-octo@example.com", "github", "42", "Octo")
+    assert renamed.id == first.id, "An email change at the provider should not create a new account"
+
+    assert await async_db.scalar(select(func.count()).select_from(User)) == 1
+    assert await async_db.scalar(select(func.count()).select_from(UserOAuth)) == 1
+
+@pytest.mark.asyncio
+async def test_oauth_upsert_reports_an_identity_it_could_not_link(async_db, caplog):
+    from sqlalchemy import select
+    from app.models import UserOAuth
+
+    first = await UserService.get_or_create_oauth_user_async(async_db, "octo@example.com", "github", "42")
+    with caplog.at_level("WARNING"):
+        second = await UserService.get_or_create_oauth_user_async(async_db, "octo@example.com", "github", "43")
+    assert second.id == first.id
+    assert "github user 43 was not linked" in caplog.text, "A dropped link should not go unnoticed"
+    links = (await async_db.scalars(select(UserOAuth.oauth_user_id))).all()
+    assert links == ["42"]
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password_hash(async_sessions, monkeypatch):
+    import asyncio
+    from contextlib import asynccontextmanager
+    from passlib.context import CryptContext
+    from app.models import User
+    from app.services import user as user_service
+    from app.core.security import security_manager
+
+    @asynccontextmanager
+    async def session_scope():
+        async with async_sessions() as session:
+            yield session
+
+    monkeypatch.setattr(user_service, "session_scope", session_scope)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(TEST_USER_PASSWORD)
+    async with async_sessions() as session:
+        session.add(User(email=TEST_USER_EMAIL, hashed_password=old_hash, full_name=TEST_USER_FULL_NAME))
+        await session.commit()
+        assert security_manager.needs_rehash(old_hash), "Hash below the configured rounds should be flagged"
+
+        assert await UserService.authenticate_user_async(session, TEST_USER_EMAIL, TEST_USER_PASSWORD)
+        await asyncio.gather(*user_service._background_tasks)
+
+    async with async_sessions() as session:
+        user = await UserRepository(session).get_by_email(TEST_USER_EMAIL)
+        assert user.hashed_password != old_hash, "Login should write back an upgraded hash"
+        assert not security_manager.needs_rehash(user.hashed_password)
+        assert security_manager.verify_password(TEST_USER_PASSWORD, user.hashed_password)
+
+def test_sqlite_engines_apply_pragmas_and_read_only_pool(tmp_path):
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.db import Base, create_db_engine
+
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    write_engine, read_engine = create_db_engine(url), create_db_engine(url, read_only=True)
+    try:
+        Base.metadata.create_all(write_engine)
+        with write_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1, "synchronous should be NORMAL"
+        with read_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("DELETE FROM users"))
+    finally:
+        write_engine.dispose()
+        read_engine.dispose()
+
+def test_migrations_create_schema_and_startup_check(tmp_path):
+    from sqlalchemy import create_engine, inspect
+    from app.migrations import SchemaOutOfDate, check_schema, latest_version, upgrade
+
+    migration_engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    try:
+        with pytest.raises(SchemaOutOfDate):
+            check_schema(migration_engine)
+
+        assert upgrade(migration_engine) == list(range(1, latest_version() + 1))
+        assert upgrade(migration_engine) == [], "A second run should have nothing to apply"
+        assert check_schema(migration_engine) == latest_version()
+
+        indexes = {index["name"]: index for index in inspect(migration_engine).get_indexes("user_oauth")}
+        assert indexes["uq_user_oauth_provider_identity"]["column_names"] == ["oauth_provider", "oauth_user_id"]
+        assert indexes["uq_user_oauth_provider_identity"]["unique"]
+        assert "ix_user_oauth_provider_identity" not in indexes
+        refresh_indexes = {index["name"]: index for index in inspect(migration_engine).get_indexes("refresh_tokens")}
+        assert refresh_indexes["uq_refresh_tokens_token_hash"]["unique"]
+    finally:
+        migration_engine.dispose()
+
+def test_create_index_rebuilds_an_invalid_postgres_index():
+    from types import SimpleNamespace
+    from app.migrations.runner import create_index
+    from app.migrations.versions.v0002_unique_provider_identity import user_oauth
+
+    class FakePostgres:
+        """Records DDL; the index is INVALID from an earlier failed concurrent build."""
+        dialect = SimpleNamespace(name="postgresql")
+
+        def __init__(self, rebuild_valid):
+            self.valid, self.rebuild_valid, self.ddl = False, rebuild_valid, []
+
+        def execute(self, statement, params):
+            return SimpleNamespace(scalar=lambda: self.valid)
+
+        def exec_driver_sql(self, sql):
+            self.ddl.append(sql.split(" ON ")[0])
+            if sql.startswith("DROP"):
+                self.valid = None
+            elif self.valid is None:
+                self.valid = self.rebuild_valid
+
+    columns = ["oauth_provider", "oauth_user_id"]
+    conn = FakePostgres(rebuild_valid=True)
+    create_index(conn, "uq_user_oauth_provider_identity", user_oauth, columns, unique=True)
+    assert conn.ddl == [
+        "DROP INDEX CONCURRENTLY IF EXISTS uq_user_oauth_provider_identity",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_user_oauth_provider_identity",
+    ]
+
+    conn = FakePostgres(rebuild_valid=False)
+    with pytest.raises(RuntimeError, match="INVALID"):
+        create_index(conn, "uq_user_oauth_provider_identity", user_oauth, columns, unique=True)
+
+def _login():
+    response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+def _me(access_token):
+    from app.core.security import security_manager
+    return security_manager.verify_token(access_token)
+
+def test_refresh_rotates_token_without_password_check(db, monkeypatch):
+    from app.core.query_trace import trace_queries
+    from app.core.security import security_manager
+    from tests.conftest import engine
+
+    create_test_user(db)
+    tokens = _login()
+    assert tokens["refresh_token"]
+
+    def no_bcrypt(*args):
+        raise AssertionError("refresh must not verify a password")
+    monkeypatch.setattr(security_manager, "verify_password_async", no_bcrypt)
+
+    with trace_queries(engine) as trace:
+        response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    assert trace.count <= 3, f"Refresh should claim, insert and load the user, ran: {[q.statement for q in trace.queries]}"
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert _me(rotated["access_token"]).email == TEST_USER_EMAIL
+    assert _me(rotated["access_token"]).session_id == _me(tokens["access_token"]).session_id
+
+    second = client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert second.status_code == 200
+
+def test_refresh_token_reuse_revokes_session(db):
+    create_test_user(db)
+    tokens = _login()
+    rotated = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    assert _me(rotated["access_token"]) is not None
+
+    reused = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert reused.status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401, \
+        "Reuse should revoke the successor too"
+    assert _me(rotated["access_token"]) is None, "Access tokens of a revoked session should be rejected"
+    assert _me(_login()["access_token"]) is not None, "Other sessions are unaffected"
+
+def test_logout_revokes_session(db):
+    create_test_user(db)
+    tokens = _login()
+    assert client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert _me(tokens["access_token"]) is None
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": "unknown"}).status_code == 401
+
+@pytest.mark.asyncio
+async def test_revocation_index_syncs_from_database(db, monkeypatch):
+    from datetime import datetime, timedelta
+    import app.db
+    from app.core.revocation import RevocationIndex
+    from app.models import RefreshToken
+    from tests.utils import testing_session_scope
+
+    index = RevocationIndex(window=timedelta(minutes=30), capacity=8)
+    user = create_test_user(db)
+    now = datetime.utcnow()
+    db.add_all([
+        RefreshToken(user_id=user.id, family_id="revoked-elsewhere", token_hash="a", expires_at=now, revoked_at=now),
+        RefreshToken(user_id=user.id, family_id="long-ago", token_hash="b", expires_at=now, revoked_at=now - timedelta(hours=1)),
+        RefreshToken(user_id=user.id, family_id="live", token_hash="c", expires_at=now),
+    ])
+    db.commit()
+    monkeypatch.setattr(app.db, "session_scope", testing_session_scope)
+
+    await index.sync()
+    assert index.is_revoked("revoked-elsewhere")
+    assert not index.is_revoked("long-ago"), "Revocations older than the access token lifetime are dropped"
+    assert not index.is_revoked("live")
+
+    for i in range(20):
+        index.revoke(f"local-{i}")
+    assert all(index.is_revoked(f"local-{i}") for i in range(20)), "The filter should grow past its capacity"
+    assert len(index) == 21
+
+def test_bloom_filter_has_no_false_negatives():
+    from app.core.bloom import BloomFilter
+
+    bloom = BloomFilter.from_items((f"item-{i}" for i in range(1000)), capacity=1000, error_rate=0.01)
+    assert all(f"item-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300, f"{false_positives} false positives for a 1% target"
+
+def test_login_rate_limit_rejects_before_hashing(db, monkeypatch):
+    from app.core.rate_limit import login_rate_limiter
+    from app.core.security import security_manager
+
+    create_test_user(db)
+    monkeypatch.setattr(login_rate_limiter, "per_email", 3)
+    verify = security_manager.verify_password_async
+    verified = []
+
+    async def counting_verify(*args):
+        verified.append(1)
+        return await verify(*args)
+    monkeypatch.setattr(security_manager, "verify_password_async", counting_verify)
+
+    for _ in range(3):
+        response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": "wrongpassword"})
+        assert response.status_code == 400
+    response = client.post("/auth/login", json={"email": TEST_USER_EMAIL.upper(), "password": TEST_USER_PASSWORD})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(verified) == 3, "Throttled attempts must not reach the password hasher"
+    assert client.post("/auth/login", json={"email": "other@example.com", "password": "wrongpassword"}).status_code == 400
+
+def test_login_rate_limit_resets_on_success_and_limits_ip(db, monkeypatch):
+    from app.core.rate_limit import login_rate_limiter
+
+    create_test_user(db)
+    monkeypatch.setattr(login_rate_limiter, "per_email", 2)
+    monkeypatch.setattr(login_rate_limiter, "per_ip", 6)
+    for _ in range(2):
+        assert client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": "wrongpassword"}).status_code == 400
+        assert client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD}).status_code == 200
+    statuses = [
+        client.post("/auth/login", json={"email": f"spray-{i}@example.com", "password": "wrongpassword"}).status_code
+        for i in range(4)
+    ]
+    assert statuses == [400, 400, 429, 429], "The per-IP limit should cover attempts across emails"
+
+@pytest.mark.asyncio
+async def test_in_memory_rate_limit_slides_and_stays_bounded(monkeypatch):
+    from app.core import rate_limit
+    from app.core.rate_limit import InMemoryRateLimitBackend
+
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    backend = InMemoryRateLimitBackend(max_size=2)
+    assert [await backend.hit("k", 4, 10.0) for _ in range(4)] == [None] * 4
+    assert await backend.hit("k", 4, 10.0) == pytest.approx(10.0)
+
+    now[0] = 1015.0
+    # Half of the previous window still overlaps: 4 * 0.5 + 1 <= 4, then 4 * 0.5 + 3 > 4.
+    assert await backend.hit("k", 4, 10.0) is None
+    assert await backend.hit("k", 4, 10.0) is None
+    assert await backend.hit("k", 4, 10.0) == pytest.approx(5.0)
+
+    now[0] = 1040.0
+    assert await backend.hit("k", 4, 10.0) is None, "Windows older than the previous one are forgotten"
+    for key in ("a", "b", "c"):
+        await backend.hit(key, 4, 10.0)
+    assert len(backend._entries) == 2
+
+@pytest.mark.asyncio
+async def test_unknown_email_login_skips_lookup_and_takes_as_long(db, monkeypatch):
+    import time
+    import app.db
+    from app.core.email_index import EmailIndex
+    from app.core.hashing import FakeVerifier
+    from app.core.query_trace import trace_queries
+    from app.services import user as user_service
+    from tests.conftest import engine
+    from tests.utils import testing_session_scope
+
+    monkeypatch.setattr(app.db, "session_scope", testing_session_scope)
+    index, verifier = EmailIndex(capacity=100), FakeVerifier(min_samples=2)
+    monkeypatch.setattr(user_service, "email_index", index)
+    monkeypatch.setattr(user_service, "fake_verifier", verifier)
+    create_test_user(db)
+    await index.rebuild()
+    assert index.might_contain(TEST_USER_EMAIL)
+    assert not index.might_contain("nobody@example.com")
+
+    for _ in range(2):
+        verifier.record(0.05)
+    with trace_queries(engine) as trace:
+        start = time.perf_counter()
+        response = client.post("/auth/login", json={"email": "nobody@example.com", "password": TEST_USER_PASSWORD})
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 400
+    lookups = [query.statement for query in trace.queries if "users.email = " in query.statement]
+    assert not lookups, f"Unknown emails should not be looked up, ran: {lookups}"
+    assert elapsed >= 0.05, "The failure should take as long as a recorded password check"
+
+    registered = client.post("/auth/register", json={"email": "new@example.com", "password": TEST_USER_PASSWORD})
+    assert registered.status_code == 201
+    assert client.post("/auth/login", json={"email": "new@example.com", "password": TEST_USER_PASSWORD}).status_code == 200
+
+@pytest.mark.asyncio
+async def test_email_index_sync_picks_up_other_workers_users(db, monkeypatch):
+    import app.db
+    from app.core.email_index import EmailIndex
+    from app.models import User
+    from tests.utils import testing_session_scope
+
+    monkeypatch.setattr(app.db, "session_scope", testing_session_scope)
+    index = EmailIndex(capacity=2)
+    assert index.might_contain("anyone@example.com"), "An index that was never built must not rule anything out"
+    create_test_user(db)
+    await index.rebuild()
+
+    db.add_all([User(email=f"elsewhere-{i}@example.com", hashed_password="x") for i in range(3)])
+    db.commit()
+    assert not index.might_contain("elsewhere-0@example.com")
+    await index.sync()
+    assert all(index.might_contain(f"elsewhere-{i}@example.com") for i in range(3))
+    await index.sync()
+    assert index._bloom.capacity >= 8, "A filter over capacity should be rebuilt larger"
+
+@pytest.mark.asyncio
+async def test_email_index_finds_rows_committed_out_of_id_order(db, monkeypatch):
+    import app.db
+    from app.core.email_index import EmailIndex
+    from app.models import User
+    from tests.utils import testing_session_scope
+
+    monkeypatch.setattr(app.db, "session_scope", testing_session_scope)
+    index = EmailIndex(capacity=100, overlap=60.0)
+    create_test_user(db)
+    await index.rebuild()
+
+    db.add(User(id=100, email="later-id@example.com", hashed_password="x"))
+    db.commit()
+    await index.sync()
+    # A transaction that took id 50 before id 100 but committed after it was synced.
+    db.add(User(id=50, email="earlier-id@example.com", hashed_password="x"))
+    db.commit()
+    await index.sync()
+    assert index.might_contain("earlier-id@example.com")
+    assert index._bloom.count == 3, "Re-read rows should not be counted twice"
+
+@pytest.mark.asyncio
+async def test_user_registered_on_another_worker_can_log_in_before_the_next_sync(db, monkeypatch):
+    import app.db
+    from app.core.email_index import EmailIndex
+    from app.core.security import security_manager
+    from app.models import User
+    from app.services import user as user_service
+    from tests.utils import testing_session_scope
+
+    monkeypatch.setattr(app.db, "session_scope", testing_session_scope)
+    index = EmailIndex(capacity=100, refresh_interval=0.0)
+    monkeypatch.setattr(user_service, "email_index", index)
+    await index.rebuild()
+    db.add(User(email=TEST_USER_EMAIL, hashed_password=security_manager.get_password_hash(TEST_USER_PASSWORD)))
+    db.commit()
+    assert not index.might_contain(TEST_USER_EMAIL)
+    response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD})
+    assert response.status_code == 200, "A miss should be confirmed against the database, not trusted"
+
+@pytest.mark.asyncio
+async def test_fake_verifier_falls_back_to_a_real_check_until_sampled():
+    from app.core.hashing import FakeVerifier
+
+    verifier = FakeVerifier(min_samples=2)
+    calls = []
+
+    async def fallback():
+        calls.append(1)
+    for _ in range(3):
+        await verifier.wait(fallback)
+    assert len(calls) == 2, "Fallback durations become the first samples"
+
+def test_token_response_shape_is_unchanged(db):
+    create_test_user(db)
+    response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD})
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert set(body) == {"access_token", "token_type", "refresh_token"} and body["token_type"] == "bearer"
+    schema = client.get("/openapi.json").json()
+    login = schema["paths"]["/auth/login"]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert login["$ref"].endswith("/LoginResponse"), "The response model should still document the endpoint"
+
+def test_schema_configs_apply(db):
+    from app.schemas import UserOut
+
+    user_in = UserCreate(email=TEST_USER_EMAIL, password="  spaced password  ", full_name="  Test User  ")
+    assert user_in.full_name == "Test User"
+    assert user_in.password == "  spaced password  ", "Passwords must not be stripped"
+    user = create_test_user(db)
+    assert UserOut.model_validate(user).email == TEST_USER_EMAIL
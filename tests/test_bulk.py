@@ -0,0 +1,81 @@
+# tests/test_bulk.py
+import io
+import json
+
+import pytest
+
+from app.bulk import export_users, import_users, read_rows
+from app.core.security import security_manager
+from app.models import User
+from tests.conftest import engine
+from tests.utils import create_test_user, TEST_USER_EMAIL, TEST_USER_PASSWORD
+
+
+def test_import_batches_hashes_and_skips_duplicates(db):
+    from app.core.query_trace import trace_queries
+
+    create_test_user(db)
+    prehashed = security_manager.get_password_hash("imported-secret")
+    source = io.StringIO(
+        "email,full_name,password,hashed_password\n"
+        f"{TEST_USER_EMAIL},Existing,{TEST_USER_PASSWORD},\n"
+        "a@example.com,Alice,alice-password,\n"
+        f"b@example.com,Bob,,{prehashed}\n"
+        "a@example.com,Alice again,alice-password,\n"
+        "not-an-email,Nobody,whatever-password,\n"
+        "c@example.com,Carol,,not-a-hash\n"
+        f"d@example.com,,,{prehashed}\n"
+    )
+    rejected = []
+    with trace_queries(engine) as trace:
+        report = import_users(
+            engine, read_rows(source, "csv"), batch_size=2, workers=1,
+            on_reject=lambda line, email, reason: rejected.append((line, reason)),
+        )
+
+    assert (report.read, report.inserted, report.duplicates, report.invalid) == (7, 3, 2, 2)
+    assert [line for line, _ in rejected] == [1, 4, 5, 6]
+    inserts = [q for q in trace.queries if q.statement.lstrip().upper().startswith("INSERT")]
+    assert len(inserts) <= 3, "Each batch should be a single executemany INSERT"
+    selects = [q.statement for q in trace.queries if q.statement.lstrip().upper().startswith("SELECT")]
+    assert len(selects) <= 4 and all(" IN " in statement.upper() for statement in selects), (
+        f"Duplicates should be looked up per batch, not by reading every email: {selects}"
+    )
+
+    by_email = {user.email: user for user in db.query(User).all()}
+    assert set(by_email) == {TEST_USER_EMAIL, "a@example.com", "b@example.com", "d@example.com"}
+    assert security_manager.verify_password("alice-password", by_email["a@example.com"].hashed_password)
+    assert by_email["b@example.com"].hashed_password == prehashed
+
+    with pytest.raises(ValueError):
+        import_users(engine, [{"email": "a@example.com", "password": "alice-password"}], workers=1, skip_duplicates=False)
+
+
+def test_import_hashes_on_a_process_pool(db):
+    rows = [{"email": f"pool-{i}@example.com", "password": f"password-{i}"} for i in range(3)]
+    report = import_users(engine, iter(rows), batch_size=10, workers=2)
+    assert report.inserted == 3 and report.rows_per_second > 0
+    user = db.query(User).filter(User.email == "pool-2@example.com").one()
+    assert security_manager.verify_password("password-2", user.hashed_password)
+
+
+@pytest.mark.parametrize("format", ["csv", "jsonl"])
+def test_export_round_trips_through_import(db, format):
+    create_test_user(db)
+    for i in range(4):
+        db.add(User(email=f"export-{i}@example.com", hashed_password=security_manager.get_password_hash("x" * 8), full_name=None))
+    db.commit()
+
+    output = io.StringIO()
+    assert export_users(engine, output, format, page_size=2) == 5
+    exported = list(read_rows(io.StringIO(output.getvalue()), format))
+    assert [row["email"] for row in exported][0] == TEST_USER_EMAIL
+    if format == "jsonl":
+        assert json.loads(output.getvalue().splitlines()[0])["hashed_password"].startswith("$")
+
+    db.query(User).delete()
+    db.commit()
+    report = import_users(engine, iter(exported), workers=1)
+    assert report.inserted == 5
+    restored = db.query(User).filter(User.email == TEST_USER_EMAIL).one()
+    assert security_manager.verify_password(TEST_USER_PASSWORD, restored.hashed_password)
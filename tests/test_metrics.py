@@ -0,0 +1,70 @@
+# tests/test_metrics.py
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import MetricsRegistry
+from app.main import app
+from tests.utils import TEST_USER_EMAIL, TEST_USER_PASSWORD, create_test_user
+
+client = TestClient(app)
+
+
+def test_metrics_from_many_threads_are_summed():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+    histogram = registry.histogram("job_seconds", "Job time.", buckets=(0.1, 1.0))
+
+    def work():
+        child = counter.labels("hash")
+        for _ in range(1000):
+            child.inc()
+            histogram.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    output = registry.render()
+    assert 'jobs_total{kind="hash"} 8000' in output
+    assert 'job_seconds_bucket{le="0.1"} 0' in output
+    assert 'job_seconds_bucket{le="1"} 8000' in output
+    assert 'job_seconds_bucket{le="+Inf"} 8000' in output
+    assert "job_seconds_count 8000" in output
+
+
+def test_metrics_endpoint_reports_routes_and_stages(db):
+    create_test_user(db)
+    response = client.post("/auth/login", json={"email": TEST_USER_EMAIL, "password": TEST_USER_PASSWORD})
+    assert response.status_code == 200
+    client.get("/no/such/path")
+    # A parameter whose value matches a literal segment must not be swapped for it.
+    client.get("/auth/url/url")
+
+    output = client.get("/metrics").text
+    assert 'http_requests_total{method="POST",route="/auth/login",status="200"}' in output
+    assert 'route="/auth/{provider}/url"' in output
+    assert "{provider}/{provider}" not in output
+    assert 'route="unmatched"' in output, "Unknown paths should not create a series per path"
+    assert 'auth_stage_duration_seconds_count{stage="password_verify"}' in output
+    assert 'auth_stage_duration_seconds_count{stage="jwt_sign"}' in output
+
+
+def test_query_trace_flags_repeated_statements_without_values(caplog):
+    from sqlalchemy import create_engine, text
+
+    from app.core.query_trace import report, trace_queries
+
+    engine = create_engine("sqlite://")
+    with trace_queries(engine) as trace, engine.connect() as conn:
+        for user_id in range(3):
+            conn.execute(text("SELECT :email, :user_id"), {"email": "secret@example.com", "user_id": user_id})
+
+    assert trace.count == 3
+    assert trace.queries[0].parameter_shape == "(str, int)"
+    with caplog.at_level("WARNING", logger="app.core.query_trace"):
+        report(trace)
+    assert "possible N+1" in caplog.text
+    assert "secret@example.com" not in caplog.text, "Bound values must never be logged"
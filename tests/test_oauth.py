@@ -0,0 +1,493 @@
+# tests/test_oauth.py
+import asyncio
+import base64
+import hashlib
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core import resilience
+from app.core.http_client import SharedHTTPClient
+from app.core.metrics import metrics
+from app.core.oauth_state import BINDING_COOKIE, InMemoryStateStore, InvalidStateError, OAuthStateManager, oauth_state
+from app.core.resilience import CircuitOpenError
+from app.main import app
+from app.services.oauth.oauth import OAuthService
+from app.services.oauth.oauth_providers import GoogleOAuthProvider
+from app.services.oauth.oauth_registry import OAuthProviderRegistry
+from app.services.oauth.oidc import OIDCMetadataCache
+from tests.fake_provider import SIGNING_KID, fake_provider_app, faults, signing_key
+
+
+def fake_provider_transport(handler_overrides=None):
+    routes = {
+        ("POST", "github.com", "/login/oauth/access_token"): lambda request: httpx.Response(
+            200, json={"access_token": "gh-token", "token_type": "bearer"}
+        ),
+        ("GET", "api.github.com", "/user"): lambda request: httpx.Response(
+            200, json={"id": 42, "login": "octocat", "name": "The Octocat", "email": None}
+        ),
+        ("GET", "api.github.com", "/user/emails"): lambda request: httpx.Response(
+            200, json=[{"email": "other@example.com", "primary": False}, {"email": "octo@example.com", "primary": True}]
+        ),
+    }
+    routes.update(handler_overrides or {})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        route = routes.get((request.method, request.url.host, request.url.path))
+        if route is None:
+            return httpx.Response(404)
+        return route(request)
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture(autouse=True)
+def fresh_resilience(monkeypatch):
+    """Give every test its own breakers and keep retry backoff short."""
+    monkeypatch.setattr(resilience, "_resilience", {})
+    monkeypatch.setattr(settings, "OAUTH_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(settings, "OAUTH_RETRY_MAX_DELAY", 0.005)
+
+
+@pytest_asyncio.fixture
+async def http_client():
+    client = SharedHTTPClient(transport=fake_provider_transport())
+    client.start()
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_github_callback_uses_shared_client(http_client):
+    oauth_service = OAuthService(http_client)
+    token_data = await oauth_service.exchange_code_for_token("github", "code")
+    user_data = await oauth_service.get_oauth_user_data("github", token_data["access_token"])
+    assert user_data["email"] == "octo@example.com", "Primary GitHub email should be used"
+    assert (user_data["oauth_provider"], user_data["oauth_user_id"]) == ("github", "42")
+    assert http_client.stats()["requests"] == 3, "Token, profile and email calls should share one client"
+
+
+@pytest.mark.asyncio
+async def test_github_profile_and_emails_are_fetched_concurrently():
+    in_flight, peak = 0, 0
+
+    def slow(payload, status_code=200):
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.05)
+            finally:
+                in_flight -= 1
+            return httpx.Response(status_code, json=payload)
+        return handler
+
+    client = SharedHTTPClient(transport=fake_provider_transport({
+        ("GET", "api.github.com", "/user"): slow({"id": 42, "login": "octocat", "email": None}),
+        ("GET", "api.github.com", "/user/emails"): slow([{"email": "octo@example.com", "primary": True}]),
+    }))
+    try:
+        user_data = await OAuthService(client).get_oauth_user_data("github", "gh-token")
+    finally:
+        await client.aclose()
+    assert user_data["email"] == "octo@example.com"
+    assert peak == 2, "Profile and email requests should overlap"
+
+
+@pytest.mark.asyncio
+async def test_failed_userinfo_request_cancels_the_others():
+    cancelled = asyncio.Event()
+
+    async def hanging_profile(request):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return httpx.Response(200, json={})
+
+    client = SharedHTTPClient(transport=fake_provider_transport({
+        ("GET", "api.github.com", "/user"): hanging_profile,
+        ("GET", "api.github.com", "/user/emails"): lambda request: httpx.Response(500),
+    }))
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await OAuthService(client).get_oauth_user_data("github", "gh-token")
+    finally:
+        await client.aclose()
+    assert exc_info.value.status_code == 400
+    assert cancelled.is_set(), "The profile request should be cancelled, not left running"
+
+
+def counting(handler):
+    def wrapper(request):
+        wrapper.calls += 1
+        return handler(request)
+    wrapper.calls = 0
+    return wrapper
+
+
+@pytest.mark.asyncio
+async def test_userinfo_get_is_retried_after_transient_failures():
+    outcomes = iter([httpx.Response(503), httpx.ConnectError("refused"), None])
+
+    def flaky_emails(request):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome or httpx.Response(200, json=[{"email": "octo@example.com", "primary": True}])
+
+    emails = counting(flaky_emails)
+    client = SharedHTTPClient(transport=fake_provider_transport({("GET", "api.github.com", "/user/emails"): emails}))
+    try:
+        user_data = await OAuthService(client).get_oauth_user_data("github", "gh-token")
+    finally:
+        await client.aclose()
+    assert user_data["email"] == "octo@example.com"
+    assert emails.calls == 3
+    assert resilience.resilience_for("github").breaker.state == resilience.CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_token_exchange_is_not_retried():
+    token = counting(lambda request: httpx.Response(503))
+    client = SharedHTTPClient(transport=fake_provider_transport({("POST", "github.com", "/login/oauth/access_token"): token}))
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await OAuthService(client).exchange_code_for_token("github", "code")
+    finally:
+        await client.aclose()
+    assert exc_info.value.status_code == 400
+    assert token.calls == 1, "Authorization codes are single-use, so the POST must not be repeated"
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures_and_recovers(monkeypatch):
+    monkeypatch.setattr(settings, "OAUTH_RETRY_ATTEMPTS", 1)
+    monkeypatch.setattr(settings, "OAUTH_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "OAUTH_BREAKER_RESET_TIMEOUT", 0.05)
+    healthy = [False]
+    profile = counting(lambda request: httpx.Response(200, json={"id": 42, "email": "octo@example.com"})
+                       if healthy[0] else httpx.Response(502))
+    client = SharedHTTPClient(transport=fake_provider_transport({("GET", "api.github.com", "/user"): profile}))
+    service = OAuthService(client)
+    breaker = resilience.resilience_for("github").breaker
+    try:
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await service._fetch_resource(service.get_provider("github"), "profile", "https://api.github.com/user", "t")
+        assert breaker.state == breaker.OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await service._fetch_resource(service.get_provider("github"), "profile", "https://api.github.com/user", "t")
+        assert exc_info.value.status_code == 503 and "Retry-After" in exc_info.value.headers
+        assert profile.calls == 2, "An open circuit should fail fast without calling the provider"
+        assert 'oauth_circuit_state{provider="github"} 2' in metrics.render()
+
+        healthy[0] = True
+        await asyncio.sleep(0.06)
+        await service._fetch_resource(service.get_provider("github"), "profile", "https://api.github.com/user", "t")
+        assert breaker.state == breaker.CLOSED, "A successful trial request should close the circuit"
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_trial_cancelled_during_backoff_releases_the_half_open_slot():
+    healthy = [False]
+    backing_off = asyncio.Event()
+
+    async def send():
+        if healthy[0]:
+            return httpx.Response(200)
+        backing_off.set()
+        return httpx.Response(502)
+
+    provider = resilience.ProviderResilience(
+        "github", max_attempts=3, base_delay=10.0, max_delay=10.0,
+        breaker=resilience.CircuitBreaker("github", failure_threshold=1, reset_timeout=0.0),
+    )
+    provider.breaker.record_failure()
+    trial = asyncio.ensure_future(provider.call(send, idempotent=True))
+    await backing_off.wait()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    healthy[0] = True
+    response = await provider.call(send, idempotent=True)
+    assert response.status_code == 200
+    assert provider.breaker.state == provider.breaker.CLOSED, "A later trial should still be let through"
+
+
+def test_open_circuit_surfaces_as_503_from_the_callback():
+    breaker = resilience.resilience_for("github").breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    state, _ = oauth_state.issue("github", "browser")
+    test_client = TestClient(app, cookies={BINDING_COOKIE: "browser"})
+    response = test_client.get("/auth/github/callback", params={"code": "abc", "state": state})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_hedged_userinfo_request_cuts_tail_latency(monkeypatch):
+    monkeypatch.setattr(settings, "OAUTH_HEDGE_DELAY", 0.02)
+    faults.paths = ("/user",)
+    faults.slow_next, faults.slow_latency = 1, 2.0
+    client = SharedHTTPClient(transport=httpx.ASGITransport(app=fake_provider_app))
+    loop = asyncio.get_running_loop()
+    try:
+        start = loop.time()
+        user_data = await OAuthService(client).get_oauth_user_data("github", "octocat")
+        elapsed = loop.time() - start
+    finally:
+        faults.reset()
+        await client.aclose()
+    assert user_data["email"] == "octocat@example.com"
+    assert elapsed < 1.0, "The backup request should answer long before the slow one"
+    assert 'oauth_hedged_requests_total{provider="github"}' in metrics.render()
+
+
+@pytest.fixture
+def oidc_client_ids(monkeypatch):
+    """id_token audiences are checked against the client id, which is blank in the test environment."""
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_ID", "google-client")
+    monkeypatch.setattr(settings, "LINKEDIN_CLIENT_ID", "linkedin-client")
+
+
+class RecordingTransport(httpx.ASGITransport):
+    """Serves the fake provider and records the paths it was asked for."""
+
+    def __init__(self):
+        super().__init__(app=fake_provider_app)
+        self.paths = []
+
+    async def handle_async_request(self, request):
+        self.paths.append(request.url.path)
+        return await super().handle_async_request(request)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("provider", ["google", "linkedin"])
+async def test_id_token_is_verified_locally_without_userinfo(provider, oidc_client_ids):
+    transport = RecordingTransport()
+    client = SharedHTTPClient(transport=transport)
+    service = OAuthService(client)
+    try:
+        for user in ("alice", "bob"):
+            token_data = await service.exchange_code_for_token(provider, user)
+            user_data = await service.get_oauth_user_data(provider, token_data["access_token"], token_data["id_token"])
+            assert (user_data["email"], user_data["oauth_user_id"]) == (f"{user}@example.com", user)
+    finally:
+        await client.aclose()
+    assert not any("userinfo" in path for path in transport.paths), "Verified id_token claims should replace userinfo"
+    assert len([path for path in transport.paths if "openid-configuration" in path]) == 1
+    assert len([path for path in transport.paths if path.endswith(("certs", "jwks"))]) == 1, "JWKS should be cached"
+
+
+def forged_id_token(claims_overrides=None, key=None):
+    from jose import jwt
+
+    claims = {"iss": "https://accounts.google.com", "aud": "google-client", "sub": "mallory",
+              "email": "mallory@example.com", "exp": 4102444800}
+    claims.update(claims_overrides or {})
+    return jwt.encode(claims, key or signing_key(), algorithm="RS256", headers={"kid": SIGNING_KID})
+
+
+def other_key():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("token_factory", [
+    lambda: forged_id_token(key=other_key()),
+    lambda: forged_id_token({"aud": "someone-else"}),
+    lambda: forged_id_token({"exp": 1}),
+    lambda: forged_id_token({"email": None}),
+], ids=["bad-signature", "wrong-audience", "expired", "no-email"])
+async def test_unusable_id_token_falls_back_to_userinfo(token_factory, oidc_client_ids):
+    transport = RecordingTransport()
+    client = SharedHTTPClient(transport=transport)
+    try:
+        user_data = await OAuthService(client).get_oauth_user_data("google", "alice", token_factory())
+    finally:
+        await client.aclose()
+    assert user_data["email"] == "alice@example.com", "Userinfo, not the id_token, should decide the identity"
+    assert "/oauth2/v2/userinfo" in transport.paths
+
+
+@pytest.mark.asyncio
+async def test_oidc_cache_serves_stale_documents_while_refreshing():
+    transport = RecordingTransport()
+    client = SharedHTTPClient(transport=transport)
+    cache = OIDCMetadataCache(client, ttl=0)
+    url = "https://accounts.google.com/.well-known/openid-configuration"
+    try:
+        first = await cache.get(url, "google")
+        second = await cache.get(url, "google")
+        assert second is first, "A stale document should be returned without waiting"
+        assert len(transport.paths) == 1
+        await asyncio.sleep(0.05)
+        assert len(transport.paths) == 2, "The stale document should be refreshed in the background"
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_login_url_state_round_trips_with_pkce_verifier():
+    transport = RecordingTransport()
+    client = SharedHTTPClient(transport=transport)
+    service = OAuthService(client)
+    try:
+        query = parse_qs(urlsplit(await service.get_oauth_login_url("google", binding="browser")).query)
+        assert query["code_challenge_method"] == ["S256"]
+        verifier = await oauth_state.consume(query["state"][0], "google", "browser")
+        challenge = base64.urlsafe_b64encode(hashlib.sha256(verifier.encode()).digest()).rstrip(b"=").decode()
+        assert query["code_challenge"] == [challenge]
+
+        captured = {}
+        original = transport.handle_async_request
+
+        async def capture(request):
+            captured.update(parse_qs(request.content.decode()))
+            return await original(request)
+
+        transport.handle_async_request = capture
+        await service.exchange_code_for_token("google", "alice", verifier)
+        assert captured["code_verifier"] == [verifier]
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_state_is_rejected_when_forged_replayed_expired_or_for_another_provider():
+    manager = OAuthStateManager("secret", InMemoryStateStore(), ttl=600)
+    state, _ = manager.issue("github", "browser")
+    payload, _, mac = state.partition(".")
+    stale = OAuthStateManager("secret", manager.store, ttl=-1)
+    other = OAuthStateManager("other", InMemoryStateStore())
+    cases = {
+        "missing": (None, "github", "browser"),
+        "bad signature": (f"{payload}.{mac[::-1]}", "github", "browser"),
+        "signed with another secret": (other.issue("github", "browser")[0], "github", "browser"),
+        "wrong provider": (state, "google", "browser"),
+        "expired": (stale.issue("github", "browser")[0], "github", "browser"),
+        "another browser": (state, "github", "attacker"),
+        "no binding cookie": (state, "github", None),
+    }
+    for case, (candidate, provider, binding) in cases.items():
+        with pytest.raises(InvalidStateError):
+            await (stale if case == "expired" else manager).consume(candidate, provider, binding)
+
+    assert await manager.consume(state, "github", "browser") is None
+    with pytest.raises(InvalidStateError) as exc_info:
+        await manager.consume(state, "github", "browser")
+    assert exc_info.value.detail == "Invalid OAuth state: already used"
+
+
+@pytest.mark.asyncio
+async def test_full_state_store_refuses_states_it_can_no_longer_vouch_for():
+    manager = OAuthStateManager("secret", InMemoryStateStore(max_size=2))
+    states = []
+    for _ in range(3):
+        states.append(manager.issue("github", "browser")[0])
+        await asyncio.sleep(0.01)
+    first, second, third = states
+    await manager.consume(first, "github", "browser")
+    await manager.consume(second, "github", "browser")
+    await manager.consume(third, "github", "browser")  # evicts the record of ``first``
+    with pytest.raises(InvalidStateError):
+        await manager.consume(first, "github", "browser")
+    assert len(manager.store._entries) == 2
+
+
+def test_github_callback_stores_the_integer_id_as_a_string(db, monkeypatch):
+    from app.core.http_client import shared_http_client
+    from app.models import UserOAuth
+    from app.services.user import UserService
+
+    monkeypatch.setattr(shared_http_client, "transport", fake_provider_transport())
+    monkeypatch.setattr(shared_http_client, "_client", None)
+    identities = []
+    resolve = UserService.get_or_create_oauth_user_async
+
+    async def recording(db, email, oauth_provider, oauth_user_id, full_name=None):
+        identities.append(oauth_user_id)
+        return await resolve(db, email, oauth_provider, oauth_user_id, full_name)
+
+    monkeypatch.setattr(UserService, "get_or_create_oauth_user_async", staticmethod(recording))
+    browser = TestClient(app, cookies={BINDING_COOKIE: "browser"})
+    for _ in range(2):
+        state, _ = oauth_state.issue("github", "browser")
+        response = browser.get("/auth/github/callback", params={"code": "abc", "state": state})
+        assert response.status_code == 200, response.text
+    assert identities == ["42", "42"], "The provider identity should reach the String column as a string"
+    assert [link.oauth_user_id for link in db.query(UserOAuth).all()] == ["42"]
+
+
+def test_callback_url_from_another_browser_is_rejected():
+    attacker = TestClient(app)
+    response = attacker.get("/auth/github/url")
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{BINDING_COOKIE}=") and "HttpOnly" in cookie and "samesite=lax" in cookie.lower()
+    state = parse_qs(urlsplit(response.json()["url"]).query)["state"][0]
+
+    victim = TestClient(app)
+    response = victim.get("/auth/github/callback", params={"code": "attackers-code", "state": state})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid OAuth state: issued to another browser"
+
+
+@pytest.mark.parametrize("params", [{"code": "abc"}, {"code": "abc", "state": "forged.state"}])
+def test_callback_without_a_valid_state_is_rejected_before_calling_the_provider(params):
+    response = TestClient(app).get("/auth/github/callback", params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid OAuth state")
+
+
+class ExampleOAuthProvider(GoogleOAuthProvider):
+    name = "example"
+
+    def get_auth_url(self) -> str:
+        return "https://id.example.com/authorize?"
+
+
+def test_registry_reuses_provider_instances():
+    oauth_service = OAuthService(SharedHTTPClient())
+    assert oauth_service.get_provider("github") is oauth_service.get_provider("github")
+    assert set(oauth_service.registry.names()) >= {"google", "github", "linkedin"}
+    with pytest.raises(HTTPException) as exc_info:
+        oauth_service.get_provider("myspace")
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_authorize_url_is_encoded_and_carries_state():
+    registry = OAuthProviderRegistry()
+    registry.register(ExampleOAuthProvider)
+    oauth_service = OAuthService(SharedHTTPClient(), registry=registry)
+    url = await oauth_service.get_oauth_login_url("example", state="a b&c")
+    query = parse_qs(urlsplit(url).query)
+    assert url.startswith("https://id.example.com/authorize?response_type=code&")
+    assert query["scope"] == ["openid profile email"]
+    assert query["redirect_uri"] == [settings.GOOGLE_REDIRECT_URI]
+    assert query["state"] == ["a b&c"], "State should be URL-encoded"
+    assert " " not in url
+
+
+def test_unknown_provider_url_returns_400():
+    response = TestClient(app).get("/auth/myspace/url")
+    assert response.status_code == 400
@@ -0,0 +1,210 @@
+# tests/test_security.py
+import asyncio
+import base64
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+from app.core.hashing import HashingCapacityExceeded, PasswordHashExecutor, calibrate_policy, get_policy
+from app.core.security import SecurityManager
+from app.core.token_cache import VerifiedTokenCache
+from app.core.tokens import BACKENDS, InvalidTokenError, PyJWTBackend, SigningKey, TokenEngine
+from app.core.user_cache import InMemoryUserCacheBackend, RedisUserCacheBackend, UserCache, UserSnapshot
+from app.models import User
+from app.schemas import TokenData
+from tests.utils import TEST_USER_PASSWORD
+
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify_roundtrip():
+    security_manager = SecurityManager()
+    hashed = await security_manager.hash_password_async(TEST_USER_PASSWORD)
+    assert await security_manager.verify_password_async(TEST_USER_PASSWORD, hashed)
+    assert not await security_manager.verify_password_async("wrongpassword", hashed)
+    assert security_manager.verify_password(TEST_USER_PASSWORD, hashed), "Sync and async hashes should be interchangeable"
+
+
+@pytest.mark.asyncio
+async def test_hash_executor_rejects_when_queue_is_full():
+    executor = PasswordHashExecutor(kind="thread", max_workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        blocked = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HashingCapacityExceeded) as exc_info:
+            await executor.run(lambda: None)
+        assert exc_info.value.status_code == 503
+        release.set()
+        assert await blocked is True
+        assert await executor.run(lambda: "ok") == "ok", "Slot should be freed once the job finishes"
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_calibrate_policy_scales_bcrypt_rounds_with_budget():
+    policy = get_policy()
+    fast = calibrate_policy(policy, target_ms=0.001)
+    slow = calibrate_policy(policy, target_ms=10000)
+    assert fast["bcrypt__rounds"] == policy["bcrypt__rounds"], "Rounds should never drop below the configured cost"
+    assert slow["bcrypt__rounds"] > fast["bcrypt__rounds"]
+    assert policy["bcrypt__rounds"] == get_policy()["bcrypt__rounds"], "Calibration should not mutate its input"
+
+
+@pytest.mark.parametrize("scheme, setting, configured", [("bcrypt", "bcrypt__rounds", 12), ("argon2", "argon2__time_cost", 3)])
+def test_calibration_never_downgrades_the_configured_cost(scheme, setting, configured):
+    from passlib.context import CryptContext
+
+    policy = {**get_policy(), "schemes": [scheme, *(s for s in get_policy()["schemes"] if s != scheme)], setting: configured}
+    calibrated = calibrate_policy(policy, target_ms=0.001)
+    assert calibrated[setting] == configured, "A fast host must not calibrate below the configured cost"
+
+    context = CryptContext(**calibrated)
+    stronger = CryptContext(**{**policy, setting: configured + 1}).hash(TEST_USER_PASSWORD)
+    weaker = CryptContext(**{**policy, setting: configured - 1}).hash(TEST_USER_PASSWORD)
+    assert not context.needs_update(stronger), "Hashes from a host that calibrated higher should be kept"
+    assert context.needs_update(weaker)
+
+
+def test_verify_token_decodes_once(monkeypatch):
+    security_manager = SecurityManager()
+    security_manager.token_cache = VerifiedTokenCache(max_size=10)
+    token = security_manager.create_access_token({"sub": "cached@example.com"})
+
+    decode_calls = []
+    real_verify = security_manager.token_engine.verify
+    monkeypatch.setattr(security_manager.token_engine, "verify", lambda t: decode_calls.append(1) or real_verify(t))
+
+    assert security_manager.verify_token(token).email == "cached@example.com"
+    assert security_manager.verify_token(token).email == "cached@example.com"
+    assert len(decode_calls) == 1, "Second verification should be served from the cache"
+    assert security_manager.token_cache.stats()["hits"] == 1
+
+    security_manager.invalidate_user_tokens("cached@example.com")
+    assert security_manager.verify_token(token) is not None
+    assert len(decode_calls) == 2, "Invalidated tokens must be verified again"
+
+
+def test_token_cache_expiry_and_lru_eviction():
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put("expired", TokenData(email="a@example.com"), time.time() - 1)
+    assert cache.get("expired") is None, "Tokens past exp must never be cached"
+
+    cache.put("short", TokenData(email="a@example.com"), time.time() + 0.05)
+    time.sleep(0.06)
+    assert cache.get("short") is None, "Entries should expire at the token's exp"
+
+    later = time.time() + 60
+    cache.put("one", TokenData(email="a@example.com"), later)
+    cache.put("two", TokenData(email="b@example.com"), later)
+    cache.get("one")
+    cache.put("three", TokenData(email="c@example.com"), later)
+    assert cache.get("two") is None, "Least recently used entry should be evicted"
+    assert cache.get("one") is not None and cache.get("three") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_verify_token_rejects_tampered_token():
+    security_manager = SecurityManager()
+    token = security_manager.create_access_token({"sub": "cached@example.com"}, timedelta(minutes=5))
+    assert security_manager.verify_token(token + "x") is None
+
+
+class FakeRedis:
+    """Minimal stand-in for redis.asyncio.Redis used by the shared user cache."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend_factory", [
+    lambda: InMemoryUserCacheBackend(max_size=10),
+    lambda: RedisUserCacheBackend(FakeRedis()),
+])
+async def test_user_cache_reads_through_and_invalidates(backend_factory):
+    cache = UserCache(backend_factory(), ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return User(id=1, email="cached@example.com", full_name="Cached", is_active=True)
+
+    first = await cache.get_or_load("cached@example.com", loader)
+    second = await cache.get_or_load("cached@example.com", loader)
+    assert first == second == UserSnapshot(id=1, email="cached@example.com", full_name="Cached", is_active=True)
+    assert len(loads) == 1, "Second lookup should not reach the database"
+    with pytest.raises(AttributeError):
+        second.is_active = False
+
+    await cache.invalidate("cached@example.com")
+    await cache.get_or_load("cached@example.com", loader)
+    assert len(loads) == 2, "Invalidated users must be reloaded"
+
+
+def _hs256_engine(backend_name, keys=None, active_kid="v1"):
+    keys = keys or {"v1": "first-secret-0123456789abcdefghijklmnop"}
+    return TokenEngine(BACKENDS[backend_name](), [SigningKey(kid, "HS256", secret, secret) for kid, secret in keys.items()], active_kid)
+
+
+@pytest.mark.parametrize("issuer", ["jose", "pyjwt", "hs256"])
+@pytest.mark.parametrize("verifier", ["jose", "pyjwt", "hs256"])
+def test_hs256_backends_are_interchangeable(issuer, verifier):
+    token = _hs256_engine(issuer).issue({"sub": "user@example.com", "exp": datetime.utcnow() + timedelta(minutes=5)})
+    assert _hs256_engine(verifier).verify(token)["sub"] == "user@example.com"
+
+
+@pytest.mark.parametrize("backend_name", ["jose", "hs256"])
+def test_token_engine_rejects_expired_and_tampered_tokens(backend_name):
+    engine = _hs256_engine(backend_name)
+    expired = engine.issue({"sub": "user@example.com", "exp": datetime.utcnow() - timedelta(seconds=5)})
+    with pytest.raises(InvalidTokenError):
+        engine.verify(expired)
+
+    token = engine.issue({"sub": "user@example.com", "exp": datetime.utcnow() + timedelta(minutes=5)})
+    header, payload, signature = token.split(".")
+    forged_payload = base64.urlsafe_b64encode(b'{"sub":"admin@example.com"}').rstrip(b"=").decode()
+    with pytest.raises(InvalidTokenError):
+        engine.verify(f"{header}.{forged_payload}.{signature}")
+    with pytest.raises(InvalidTokenError):
+        engine.verify("not-a-token")
+
+
+def test_key_rotation_accepts_retired_keys_until_removed():
+    old_engine = _hs256_engine("hs256")
+    old_token = old_engine.issue({"sub": "user@example.com"})
+
+    rotated = _hs256_engine("hs256", {"v1": "first-secret-0123456789abcdefghijklmnop", "v2": "second-secret-0123456789abcdefghijklmnop"}, active_kid="v2")
+    new_token = rotated.issue({"sub": "user@example.com"})
+    assert rotated.verify(old_token)["sub"] == "user@example.com", "Tokens signed with a retired key stay valid"
+    assert rotated.verify(new_token)["sub"] == "user@example.com"
+
+    retired = _hs256_engine("hs256", {"v2": "second-secret-0123456789abcdefghijklmnop"}, active_kid="v2")
+    with pytest.raises(InvalidTokenError):
+        retired.verify(old_token)
+
+
+@pytest.mark.parametrize("algorithm, private_key_factory", [
+    ("ES256", lambda: ec.generate_private_key(ec.SECP256R1())),
+    ("EdDSA", lambda: ed25519.Ed25519PrivateKey.generate()),
+])
+def test_asymmetric_tokens_verify_with_public_key_only(algorithm, private_key_factory):
+    private_key = private_key_factory()
+    signer = TokenEngine(PyJWTBackend(), [SigningKey("k1", algorithm, private_key, private_key.public_key())], "k1")
+    token = signer.issue({"sub": "user@example.com"})
+
+    verifier = TokenEngine(PyJWTBackend(), [SigningKey("k1", algorithm, None, private_key.public_key())], "k1")
+    assert verifier.verify(token)["sub"] == "user@example.com"
+    assert [key["kid"] for key in signer.jwks()["keys"]] == ["k1"]
@@ -1,16 +1,63 @@
 # tests/utils.py
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from app.services.user import UserService
-from app.models import User
+from app.models import RefreshToken, User, UserOAuth
 from app.schemas import UserCreate
 
 TEST_USER_EMAIL = "testuser@example.com"
 TEST_USER_PASSWORD = "testpassword"
 TEST_USER_FULL_NAME = "Test User"
 
+def run_async(coroutine):
+    """Run ``coroutine`` to completion from a sync test or from inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
 def create_test_user(db, email=TEST_USER_EMAIL, password=TEST_USER_PASSWORD, full_name=TEST_USER_FULL_NAME):
     user_in = UserCreate(email=email, password=password, full_name=full_name)
-    return UserService.create_user(db=db, user=user_in)
+    return run_async(UserService.create_user_async(db, user_in))
 
 def clear_db(db):
+    db.query(RefreshToken).delete()
+    db.query(UserOAuth).delete()
     db.query(User).delete()
     db.commit()
+
+@asynccontextmanager
+async def testing_session_scope():
+    """Stand-in for ``app.db.session_scope`` bound to the test database."""
+    from tests.conftest import TestingSessionLocal
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@contextmanager
+def explained_queries(engine):
+    """Collect ``(statement, plan)`` for every SELECT run on a SQLite ``engine``."""
+    from sqlalchemy import event
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            rows = conn.connection.dbapi_connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            plans.append((statement, [row[-1] for row in rows]))
+
+    event.listen(engine, "before_cursor_execute", explain)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", explain)
+
+def full_scans(plans, tables=("users", "user_oauth")):
+    """Plan lines that walk a whole table or index instead of searching it; aliases like ``users_1`` count."""
+    pattern = re.compile(rf"^SCAN (TABLE )?({'|'.join(tables)})(_\d+)?\b")
+    return [line for _, plan in plans for line in plan if pattern.match(line)]